@@ -1,77 +1,220 @@
-from fastapi import FastAPI
-from scraper import get_latest_articles, fetch_and_store
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from scraper import (get_latest_articles, search_articles, fetch_and_store, parse_published,
+                     schema_version, ARTICLE_COLUMNS, DB_PATH, SCHEMA_VERSION)
+from rollups import get_series, GRANULARITIES, ALL
+from sentiment_common import SYMBOLS
+from profiling import MemoryTracker, SlowWatch, profile_cpu
+import os
+import hmac
 import sqlite3
 from datetime import datetime
 
+# Faster serializers, used when installed (pip install orjson msgpack)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 app = FastAPI(title="Independent News API")
 
+# Compress large pages for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Profiling endpoints under /debug/ answer only requests carrying this token
+DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN')
+# Requests slower than this are profiled into profiles/ (0 = off; POST /debug/slow changes it)
+slow_requests = SlowWatch(float(os.environ.get('SLOW_REQUEST_SECONDS', 0)), label='request')
+memory = MemoryTracker()
+
+class WatchSlowRequests:
+    """ASGI middleware timing each request against slow_requests (a pass-through while it is off)"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not slow_requests.threshold:
+            return await self.app(scope, receive, send)
+        with slow_requests.watch(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+app.add_middleware(WatchSlowRequests)
+
+# The API never creates or migrates news.db: a migration can take minutes on a
+# large database, longer than run_all lets /health go unanswered. The scraper
+# (or `python scraper.py --migrate`) does it, and until then the API answers 503.
+_schema_current = False
+
+def _schema_status():
+    """None once news.db is at SCHEMA_VERSION, else why not (remembered once current)"""
+    global _schema_current
+    if _schema_current:
+        return None
+    try:
+        conn = sqlite3.connect(DB_PATH, timeout=2)
+        try:
+            version = schema_version(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        return f"error: {e}"
+    if version < SCHEMA_VERSION:
+        return f"migrating: schema v{version}, needs v{SCHEMA_VERSION}"
+    _schema_current = True
+    return None
+
+class RequireSchema:
+    """ASGI middleware answering 503 for everything but /health, /docs and /debug/ until the schema is current"""
+    OPEN = ('/health', '/docs', '/openapi.json', '/debug/')
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if _schema_current or scope['type'] != 'http' or scope['path'].startswith(self.OPEN):
+            return await self.app(scope, receive, send)
+        status = _schema_status()
+        if status is None:
+            return await self.app(scope, receive, send)
+        await JSONResponse({'error': f"news.db is not ready ({status}); the scraper migrates it, "
+                                     f"or run: python scraper.py --migrate"},
+                           status_code=503)(scope, receive, send)
+
+app.add_middleware(RequireSchema)
+
+def _parse_time(value):
+    """Accept epoch seconds or an ISO 8601 string; None passes through, unparseable is a ValueError"""
+    if value is None or value == '':
+        return None
+    if value.lstrip('-').isdigit():
+        return int(value)
+    ts = parse_published(value)
+    if ts is None:
+        raise ValueError(value)
+    return ts
+
+def _parse_window(since, until):
+    """(since, until) as epochs; None if either is given but unparseable"""
+    try:
+        return _parse_time(since), _parse_time(until)
+    except ValueError:
+        return None
+
+def _bad_request(response, message):
+    """A 400 with an error payload (every parameter check answers this way)"""
+    response.status_code = 400
+    return {'error': message}
+
+def _time_error(response):
+    return _bad_request(response, "Invalid since/until. Use epoch seconds or ISO 8601, e.g. 2025-01-06T14:00:00Z")
+
+def _parse_fields(fields):
+    """Columns for a comma-separated fields= list; None if a name is unknown"""
+    if not fields:
+        return ARTICLE_COLUMNS
+    requested = tuple(f.strip() for f in fields.split(',') if f.strip())
+    if not requested or any(f not in ARTICLE_COLUMNS for f in requested):
+        return None
+    return requested
+
+def _fields_error(response):
+    return _bad_request(response, f"Invalid fields. Use a comma-separated subset of: {', '.join(ARTICLE_COLUMNS)}")
+
+def _symbol_error(response, symbol):
+    """For a symbol the scraper does not tag: no articles or rollups could ever match"""
+    return _bad_request(response, f"Untracked symbol {symbol!r}. Tracked: {', '.join(SYMBOLS)} "
+                                  f"(SYMBOLS in sentiment_common.py)")
+
+def _respond(request, payload):
+    """Serialize payload as msgpack (if the client accepts it) or orjson, else FastAPI's JSON"""
+    if msgpack is not None and 'application/msgpack' in request.headers.get('accept', ''):
+        return Response(msgpack.packb(payload), media_type='application/msgpack')
+    if orjson is not None:
+        return Response(orjson.dumps(payload), media_type='application/json')
+    return payload
+
 @app.get("/health")
-def health():
-    """Health check"""
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+def health(response: Response):
+    """Health check (503 if the database cannot be read or is still being migrated)"""
+    db = _schema_status()
+    if db is None:
+        try:
+            conn = sqlite3.connect(DB_PATH, timeout=2)
+            conn.execute('SELECT 1 FROM articles LIMIT 1').fetchall()
+            conn.close()
+            db = "ok"
+        except sqlite3.Error as e:
+            db = f"error: {e}"
+    if db != "ok":
+        response.status_code = 503
+    status = "ok" if db == "ok" else "migrating" if db.startswith("migrating") else "degraded"
+    return {"status": status, "db": db, "timestamp": datetime.now().isoformat()}
 
 @app.get("/news/latest")
-def get_news(limit: int = 10, sentiment: str = None):
-    """Get latest news articles
+def get_news(request: Request, response: Response, limit: int = 10, sentiment: str = None,
+             since: str = None, until: str = None, symbol: str = None, fields: str = None):
+    """Get latest news articles, newest published first
     
     Parameters:
     - limit: number of articles (default 10)
     - sentiment: filter by 'positive', 'negative', 'neutral' (optional)
+    - since / until: publish-time window, epoch seconds or ISO 8601 (optional, until is exclusive)
+    - symbol: only articles mentioning this ticker, e.g. 'XOM' (optional)
+    - fields: comma-separated article fields to return, e.g. 'title,sentiment_score' (optional)
+    
+    Send 'Accept: application/msgpack' for a msgpack body.
     """
-    articles = get_latest_articles(limit=limit, sentiment_filter=sentiment)
-    
-    formatted = []
-    for title, summary, url, source, published, score, label in articles:
-        formatted.append({
-            'title': title,
-            'summary': summary,
-            'url': url,
-            'source': source,
-            'published': published,
-            'sentiment_score': score,
-            'sentiment_label': label
-        })
+    columns = _parse_fields(fields)
+    if columns is None:
+        return _fields_error(response)
+    window = _parse_window(since, until)
+    if window is None:
+        return _time_error(response)
+    if symbol and symbol.upper() not in SYMBOLS:
+        return _symbol_error(response, symbol)
     
-    return {
+    articles = get_latest_articles(limit=limit, sentiment_filter=sentiment,
+                                   since=window[0], until=window[1],
+                                   symbol=symbol, columns=columns)
+    formatted = [dict(zip(columns, row)) for row in articles]
+    
+    return _respond(request, {
         'count': len(formatted),
         'timestamp': datetime.now().isoformat(),
         'filter': sentiment if sentiment else 'all',
         'articles': formatted
-    }
+    })
 
 @app.get("/news/search")
-def search_news(query: str, limit: int = 10):
-    """Search news by keyword"""
-    conn = sqlite3.connect('news.db')
-    c = conn.cursor()
-    
-    search_term = f"%{query}%"
-    c.execute('''SELECT title, summary, url, source, published, sentiment_score, sentiment_label 
-                 FROM articles 
-                 WHERE title LIKE ? OR summary LIKE ? 
-                 ORDER BY fetched_at DESC LIMIT ?''', 
-              (search_term, search_term, limit))
-    
-    articles = c.fetchall()
-    conn.close()
+def search_news(request: Request, response: Response, query: str, limit: int = 10,
+                since: str = None, until: str = None, fields: str = None):
+    """Search news by keyword (since / until / fields work as in /news/latest)
+    
+    Only the hot window is searched unless since is given; pass an older since
+    to include archived months.
+    """
+    columns = _parse_fields(fields)
+    if columns is None:
+        return _fields_error(response)
+    window = _parse_window(since, until)
+    if window is None:
+        return _time_error(response)
     
-    formatted = []
-    for title, summary, url, source, published, score, label in articles:
-        formatted.append({
-            'title': title,
-            'summary': summary,
-            'url': url,
-            'source': source,
-            'published': published,
-            'sentiment_score': score,
-            'sentiment_label': label
-        })
+    articles = search_articles(query, limit=limit, since=window[0], until=window[1],
+                               columns=columns)
     
-    return {
+    formatted = [dict(zip(columns, row)) for row in articles]
+    
+    return _respond(request, {
         'query': query,
         'count': len(formatted),
         'articles': formatted
-    }
+    })
 
 @app.get("/news/sentiment")
 def get_by_sentiment(sentiment: str):
@@ -83,16 +226,10 @@ def get_by_sentiment(sentiment: str):
     if sentiment not in ['positive', 'negative', 'neutral']:
         return {'error': 'Invalid sentiment. Use: positive, negative, neutral'}
     
-    articles = get_latest_articles(limit=100, sentiment_filter=sentiment)
+    columns = ('title', 'sentiment_score', 'source', 'url')
+    articles = get_latest_articles(limit=100, sentiment_filter=sentiment, columns=columns)
     
-    formatted = []
-    for title, summary, url, source, published, score, label in articles:
-        formatted.append({
-            'title': title,
-            'sentiment_score': score,
-            'source': source,
-            'url': url
-        })
+    formatted = [dict(zip(columns, row)) for row in articles]
     
     return {
         'sentiment': sentiment,
@@ -100,6 +237,39 @@ def get_by_sentiment(sentiment: str):
         'articles': formatted
     }
 
+@app.get("/sentiment/series")
+def sentiment_series(response: Response, granularity: str = '1h', since: str = None,
+                     until: str = None, source: str = '*', symbol: str = '*'):
+    """Pre-aggregated sentiment over time
+    
+    Parameters:
+    - granularity: '1m', '1h' or '1d' (default '1h')
+    - since / until: epoch seconds or ISO 8601 (optional, until is exclusive)
+    - source: feed name, or '*' for all sources (default)
+    - symbol: ticker such as 'XOM', or '*' for all news (default)
+    """
+    if granularity not in GRANULARITIES:
+        return _bad_request(response, f"Invalid granularity. Use: {', '.join(GRANULARITIES)}")
+    window = _parse_window(since, until)
+    if window is None:
+        return _time_error(response)
+    if symbol != ALL:
+        if symbol.upper() not in SYMBOLS:
+            return _symbol_error(response, symbol)
+        symbol = symbol.upper()
+    
+    conn = sqlite3.connect(DB_PATH)
+    points = get_series(conn, granularity, *window, source=source, symbol=symbol)
+    conn.close()
+    
+    return {
+        'granularity': granularity,
+        'source': source,
+        'symbol': symbol,
+        'count': len(points),
+        'points': points
+    }
+
 @app.post("/scrape/now")
 def trigger_scrape():
     """Manually trigger a scrape run"""
@@ -110,6 +280,65 @@ def trigger_scrape():
         'timestamp': datetime.now().isoformat()
     }
 
+def _debug_denied(request, response):
+    """An error payload unless profiling is enabled and the X-Debug-Token header matches"""
+    if not DEBUG_TOKEN:
+        response.status_code = 404
+        return {'error': 'Profiling is disabled. Start the API with DEBUG_TOKEN set.'}
+    if not hmac.compare_digest(request.headers.get('x-debug-token', ''), DEBUG_TOKEN):
+        response.status_code = 403
+        return {'error': 'Missing or wrong X-Debug-Token header'}
+    return None
+
+@app.post("/debug/profile")
+def debug_profile(request: Request, response: Response, seconds: float = 10):
+    """Sample the API process's CPU use for `seconds` (up to 300) and return the report"""
+    denied = _debug_denied(request, response)
+    if denied:
+        return denied
+    if not 0 < seconds <= 300:
+        return _bad_request(response, 'seconds must be between 0 and 300')
+    sampler = profile_cpu(seconds)
+    path = sampler.save('api', 'CPU profile (api)')
+    return Response(sampler.report('CPU profile (api)') + f"\nSaved to {path}\n", media_type='text/plain')
+
+@app.post("/debug/memory")
+def debug_memory(request: Request, response: Response):
+    """tracemalloc snapshot: the first call starts tracing, later calls show growth since the last"""
+    denied = _debug_denied(request, response)
+    if denied:
+        return denied
+    return Response(memory.snapshot(), media_type='text/plain')
+
+@app.delete("/debug/memory")
+def debug_memory_stop(request: Request, response: Response):
+    """Stop tracemalloc (and its overhead)"""
+    denied = _debug_denied(request, response)
+    if denied:
+        return denied
+    memory.stop()
+    return {'status': 'tracing stopped'}
+
+@app.post("/debug/slow")
+def debug_slow(request: Request, response: Response, seconds: float):
+    """Profile every request slower than `seconds` from now on (0 turns it off)"""
+    denied = _debug_denied(request, response)
+    if denied:
+        return denied
+    if seconds < 0:
+        return _bad_request(response, 'seconds must be 0 (off) or more')
+    slow_requests.threshold = seconds
+    return {'slow_request_seconds': seconds, 'captured': slow_requests.captured}
+
 if __name__ == "__main__":
+    import sys
+    import threading
     import uvicorn
+    
+    # --with-scraper runs the scrape loop in this process, so a single process
+    # writes to news.db instead of the API and scheduler contending for it
+    if "--with-scraper" in sys.argv:
+        from scheduler import run_forever
+        threading.Thread(target=run_forever, name="scraper", daemon=True).start()
+    
     uvicorn.run(app, host="0.0.0.0", port=8001)
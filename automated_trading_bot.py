@@ -1,12 +1,29 @@
 import os
+import csv
+import copy
 import time
+import signal
 import logging
+import threading
 from datetime import datetime, timedelta
 from collections import defaultdict
-import pandas as pd
 import requests
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from ib_insync import *
+from rollups import weighted_score
+from sentiment_common import IMPORTANT_KEYWORDS, SYMBOLS, get_analyzer
+from profiling import MemoryTracker, SlowWatch, install_signal_handlers
+
+# pandas, ib_insync and VADER are imported where they are used so the bot
+# (and anything importing its classes) starts without loading them up front
+
+# Faster decoding of news API responses, used when installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 
 # ============================================
@@ -17,7 +34,7 @@ class Config:
     NEWS_API_KEY = os.environ.get('NEWS_API_KEY', '8d26285826f94d0e91fa073178e10600')
 
     # Trading Parameters
-    SYMBOL = 'XOM'
+    SYMBOL = 'XOM'            # must be tagged by the scraper (SYMBOLS in sentiment_common.py)
     EXCHANGE = 'SMART'
     CURRENCY = 'USD'
 
@@ -36,11 +53,28 @@ class Config:
 
     # Timing
     NEWS_CHECK_INTERVAL = 300        # Check news every 5 minutes
+    SENTIMENT_WINDOW_HOURS = 24      # Rollup window used for the aggregate score
+
+    # Each story counts once; every other source running it adds this much
+    # (0 = ignore confirmations, 1 = count every article like before clustering)
+    SOURCE_CONFIRMATION_WEIGHT = 0.5
     MARKET_OPEN_HOUR = 9
     MARKET_OPEN_MINUTE = 30
     MARKET_CLOSE_HOUR = 16
     MARKET_CLOSE_MINUTE = 0
 
+    # Shadow strategies: variants that see the same news and prices as the
+    # bot but only trade on paper, journaling fills and PnL to SHADOW_JOURNAL.
+    # Each entry overrides strategy/sentiment settings above, e.g.
+    #   'eager': {'BUY_THRESHOLD': 0.05, 'SELL_THRESHOLD': -0.05},
+    #   'no_confirmations': {'SOURCE_CONFIRMATION_WEIGHT': 0.0},
+    SHADOW_VARIANTS = {}
+    SHADOW_JOURNAL = 'shadow_journal.csv'
+
+    # Profiling (see profiling.py): cycles slower than this are profiled
+    # automatically into profiles/ (0 = off); SIGUSR1/SIGUSR2 profile on demand
+    SLOW_CYCLE_SECONDS = 60
+
     # IB Connection
     IB_HOST = '127.0.0.1'
     IB_PORT = 7497                   # 7497 for TWS paper, 4002 for IB Gateway paper
@@ -69,55 +103,84 @@ logger = logging.getLogger('QuantBot')
 # NEWS FETCHER (uses /news/latest)
 # ============================================
 class NewsFetcher:
+    # Only what the bot reads; the summary is most of a full article's payload
+    ARTICLE_FIELDS = "title,published_ts,sentiment_score,sentiment_label,source,cluster_id"
+
     def __init__(self, api_base_url="http://127.0.0.1:8001"):
         # Your FastAPI base URL
         self.api_base_url = api_base_url
+        # Keep-alive connection reused across cycles
+        self.session = requests.Session()
+        self.session.headers["Accept"] = (
+            "application/msgpack" if msgpack is not None else "application/json"
+        )
+
+    def _decode(self, resp):
+        if msgpack is not None and resp.headers.get("content-type", "").startswith("application/msgpack"):
+            return msgpack.unpackb(resp.content)
+        if orjson is not None:
+            return orjson.loads(resp.content)
+        return resp.json()
 
     def fetch_latest_news(self, query, lookback_minutes=60):
         """
         Fetch latest news from your independent API.
-        Ignores 'query' for now and just pulls the newest N articles.
+        'query' is a ticker (e.g. 'XOM'): the server returns only articles tagged
+        with it and published in the last `lookback_minutes`, with just the
+        fields the bot uses. Articles are returned as the API sends them.
         """
         try:
             params = {
-                "limit": 20
+                "limit": 20,
+                "since": int(time.time()) - lookback_minutes * 60,
+                "symbol": query,
+                "fields": self.ARTICLE_FIELDS,
                 # you could add: "sentiment": "positive"
             }
-            resp = requests.get(f"{self.api_base_url}/news/latest", params=params, timeout=10)
+            resp = self.session.get(f"{self.api_base_url}/news/latest", params=params, timeout=10)
             resp.raise_for_status()
-            data = resp.json()
+            data = self._decode(resp)
         except Exception as e:
             logger.error(f"Error calling news API: {e}")
             return []
 
-        api_articles = []
-        for a in data.get("articles", []):
-            api_articles.append({
-                "title": a.get("title", ""),
-                "description": a.get("summary", ""),
-                "url": a.get("url", ""),
-                "publishedAt": a.get("published", ""),
-                "source": {"name": a.get("source", "")},
-                "sentiment_score": a.get("sentiment_score"),
-                "sentiment_label": a.get("sentiment_label"),
-            })
-
+        api_articles = data.get("articles", [])
         logger.info(f"Fetched {len(api_articles)} articles from local news API")
         return api_articles
 
+    def fetch_sentiment_series(self, symbol, hours, granularity="1h"):
+        """
+        Fetch pre-aggregated sentiment buckets for the last `hours` from /sentiment/series.
+        Returns a list of points (empty on error).
+        """
+        try:
+            params = {
+                "granularity": granularity,
+                "symbol": symbol,
+                "since": int(time.time()) - hours * 3600,
+            }
+            resp = self.session.get(f"{self.api_base_url}/sentiment/series", params=params, timeout=10)
+            resp.raise_for_status()
+            return self._decode(resp).get("points", [])
+        except Exception as e:
+            logger.error(f"Error calling sentiment series API: {e}")
+            return []
+
 
 # ============================================
 # SENTIMENT ANALYZER
 # ============================================
 class SentimentAnalyzer:
     def __init__(self):
-        self.vader = SentimentIntensityAnalyzer()
-        self.important_keywords = [
-            'earnings', 'profit', 'revenue', 'loss', 'lawsuit', 'merger',
-            'acquisition', 'ceo', 'investigation', 'regulation', 'dividend',
-            'upgrade', 'downgrade', 'analyst', 'breakthrough', 'crisis',
-            'scandal', 'partnership', 'contract', 'bankruptcy', 'fraud'
-        ]
+        self._vader = None
+        self.important_keywords = list(IMPORTANT_KEYWORDS)
+
+    @property
+    def vader(self):
+        """The process-wide VADER analyzer (see sentiment_common.py), loaded on first use"""
+        if self._vader is None:
+            self._vader = get_analyzer()
+        return self._vader
 
     def analyze(self, text):
         """Analyze sentiment and importance of text"""
@@ -152,39 +215,69 @@ class SentimentAnalyzer:
 
         return min(score, 3.0)  # Cap at 3.0
 
-    def aggregate_sentiment(self, articles, time_decay_hours=24):
+    def aggregate_sentiment(self, articles, time_decay_hours=24, confirmation_weight=1.0):
         """Aggregate sentiment from multiple articles with time decay"""
         if not articles:
             return 0.0
 
         total_weighted_score = 0.0
         total_weight = 0.0
-        now = datetime.now()
+        now = time.time()
 
-        for article in articles:
-            analysis = self.analyze(article.get('title', '') + ' ' + article.get('description', ''))
+        for article, story_weight in zip(articles, story_weights(articles, confirmation_weight)):
+            if not story_weight:
+                continue
+            description = article.get('description', article.get('summary')) or ''
+            analysis = self.analyze((article.get('title') or '') + ' ' + description)
 
-            # Calculate time decay
+            # Calculate time decay (published_ts comes pre-parsed from the API)
             try:
-                pub_time = datetime.fromisoformat(article.get('publishedAt', '').replace('Z', '+00:00'))
-                hours_old = (now - pub_time.replace(tzinfo=None)).total_seconds() / 3600
+                pub_ts = article.get('published_ts')
+                if pub_ts is None:
+                    pub_ts = datetime.fromisoformat(article.get('publishedAt', '').replace('Z', '+00:00')).timestamp()
+                hours_old = (now - pub_ts) / 3600
                 decay_factor = max(0.1, 1 - (hours_old / time_decay_hours))
             except Exception:
                 decay_factor = 0.5
 
-            weight = analysis['importance'] * decay_factor
+            weight = analysis['importance'] * decay_factor * story_weight
             total_weighted_score += analysis['compound'] * weight
             total_weight += weight
 
         return total_weighted_score / total_weight if total_weight > 0 else 0.0
 
 
+def story_weights(articles, confirmation_weight):
+    """Per-article weights counting each story (cluster_id) once
+
+    A story's first article weighs 1, each other source that ran it
+    confirmation_weight, and further copies from the same source 0.
+    """
+    sources = {}
+    weights = []
+    for i, article in enumerate(articles):
+        cluster_id = article.get('cluster_id')
+        seen = sources.setdefault(cluster_id if cluster_id is not None else ('article', i), set())
+        source = article.get('source')
+        if isinstance(source, dict):
+            source = source.get('name')
+        if not seen:
+            weights.append(1.0)
+        elif source in seen:
+            weights.append(0.0)
+        else:
+            weights.append(confirmation_weight)
+        seen.add(source)
+    return weights
+
+
 # ============================================
 # TRADING STRATEGY
 # ============================================
 class TradingStrategy:
-    def __init__(self, config):
+    def __init__(self, config, log=None):
         self.config = config
+        self.log = log or logger
         self.daily_trades = 0
         self.last_trade_date = None
         self.position = 0
@@ -204,7 +297,7 @@ class TradingStrategy:
 
         # Check if we've hit daily trade limit
         if self.daily_trades >= self.config.MAX_DAILY_TRADES:
-            logger.info("Daily trade limit reached")
+            self.log.info("Daily trade limit reached")
             return None, 0
 
         # Check risk management rules
@@ -213,12 +306,12 @@ class TradingStrategy:
 
             # Stop loss
             if pnl_pct <= -self.config.STOP_LOSS_PCT:
-                logger.warning(f"Stop loss triggered! PnL: {pnl_pct:.2%}")
+                self.log.warning(f"Stop loss triggered! PnL: {pnl_pct:.2%}")
                 return 'CLOSE', abs(self.position)
 
             # Take profit
             if pnl_pct >= self.config.TAKE_PROFIT_PCT:
-                logger.info(f"Take profit triggered! PnL: {pnl_pct:.2%}")
+                self.log.info(f"Take profit triggered! PnL: {pnl_pct:.2%}")
                 return 'CLOSE', abs(self.position)
 
         # Generate signal based on sentiment
@@ -276,7 +369,103 @@ class TradingStrategy:
             'position': self.position
         })
 
-        logger.info(f"Trade executed: {signal} {quantity} @ ${price:.2f} | Position: {self.position}")
+        self.log.info(f"Trade executed: {signal} {quantity} @ ${price:.2f} | Position: {self.position}")
+
+
+# ============================================
+# SHADOW STRATEGIES
+# ============================================
+# Settings a shadow variant may change; everything else (symbol, IB
+# connection, timing) is shared with the bot
+VARIANT_SETTINGS = (
+    'MAX_POSITION_SIZE', 'POSITION_SIZE_PER_SIGNAL', 'MAX_DAILY_TRADES',
+    'STOP_LOSS_PCT', 'TAKE_PROFIT_PCT',
+    'STRONG_BUY_THRESHOLD', 'BUY_THRESHOLD', 'SELL_THRESHOLD', 'STRONG_SELL_THRESHOLD',
+    'SENTIMENT_WINDOW_HOURS', 'SOURCE_CONFIRMATION_WEIGHT',
+)
+
+JOURNAL_COLUMNS = ('timestamp', 'variant', 'event', 'signal', 'quantity', 'price',
+                   'position', 'sentiment', 'pnl')
+
+# Shadow variants only log errors; their trades go to the journal
+shadow_logger = logger.getChild('shadow')
+shadow_logger.setLevel(logging.ERROR)
+
+
+def variant_config(base, overrides):
+    """A copy of base with a shadow variant's overrides applied"""
+    unknown = set(overrides) - set(VARIANT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Shadow variants cannot change {', '.join(sorted(unknown))}. "
+                         f"Use: {', '.join(VARIANT_SETTINGS)}")
+    config = copy.copy(base)
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    return config
+
+
+class ShadowBook:
+    """A strategy variant trading on paper at each cycle's quote price
+
+    cash is the running sum of fill proceeds, so pnl(price) is realized plus
+    unrealized PnL (before commissions) at that price.
+    """
+
+    def __init__(self, name, config, strategy=None):
+        self.name = name
+        self.config = config
+        self.strategy = strategy or TradingStrategy(config, log=shadow_logger)
+        self.cash = 0.0
+        self.fills = 0
+
+    def settle(self, signal, quantity, price):
+        """Book a fill the strategy has already recorded"""
+        self.cash += quantity * price if signal in ('SELL', 'CLOSE') else -quantity * price
+        self.fills += 1
+
+    def step(self, sentiment_score, price):
+        """Run the variant on this cycle's inputs; returns the paper fill (signal, quantity) or None"""
+        signal, quantity = self.strategy.generate_signal(sentiment_score, price)
+        if not signal or quantity <= 0:
+            return None
+        self.strategy.record_trade(signal, quantity, price)
+        self.settle(signal, quantity, price)
+        return signal, quantity
+
+    def pnl(self, price):
+        return self.cash + self.strategy.position * price
+
+
+class ShadowJournal:
+    """CSV of paper fills (FILL rows) and per-cycle marks (MARK rows), appended once per cycle"""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = []
+
+    def add(self, book, event, timestamp, price, sentiment_score, signal=None, quantity=0):
+        self.rows.append({
+            'timestamp': timestamp,
+            'variant': book.name,
+            'event': event,
+            'signal': signal or '',
+            'quantity': quantity,
+            'price': round(price, 4),
+            'position': book.strategy.position,
+            'sentiment': '' if sentiment_score is None else round(sentiment_score, 4),
+            'pnl': round(book.pnl(price), 2),
+        })
+
+    def flush(self):
+        if not self.rows:
+            return
+        new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, JOURNAL_COLUMNS)
+            if new:
+                writer.writeheader()
+            writer.writerows(self.rows)
+        self.rows = []
 
 
 # ============================================
@@ -284,6 +473,7 @@ class TradingStrategy:
 # ============================================
 class IBTrader:
     def __init__(self, config):
+        from ib_insync import IB, Stock
         self.config = config
         self.ib = IB()
         self.connected = False
@@ -325,6 +515,7 @@ class IBTrader:
 
     def place_order(self, action, quantity):
         """Place market order"""
+        from ib_insync import MarketOrder
         try:
             order = MarketOrder(action, quantity)
             trade = self.ib.placeOrder(self.contract, order)
@@ -370,34 +561,91 @@ class QuantTradingBot:
         self.strategy = TradingStrategy(self.config)
         self.trader = IBTrader(self.config)
         self.running = False
+        self.stop_requested = threading.Event()  # set by SIGTERM/SIGBREAK; ends the wait between cycles
+
+        # Shadow variants see the same news and prices; only self.strategy routes orders
+        self.shadows = [ShadowBook(name, variant_config(self.config, overrides))
+                        for name, overrides in self.config.SHADOW_VARIANTS.items()]
+        self.primary_book = ShadowBook('primary', self.config, self.strategy)
+        self.journal = ShadowJournal(self.config.SHADOW_JOURNAL) if self.shadows else None
+        self.last_price = None
+
+        self.slow_cycles = SlowWatch(self.config.SLOW_CYCLE_SECONDS, label='cycle')
+        self.memory = MemoryTracker()
 
     def is_market_open(self):
         """TEMP: Always treat market as open for testing."""
         return True
 
+    def fetch_news(self):
+        """This cycle's news, fetched once for the bot and every shadow variant
+
+        Returns ('rollups', points), ('articles', articles) or None if there is nothing new.
+        """
+        hours = max(book.config.SENTIMENT_WINDOW_HOURS for book in [self.primary_book] + self.shadows)
+        points = self.news_fetcher.fetch_sentiment_series(self.config.SYMBOL, hours)
+        if sum(p["count"] for p in points):
+            return "rollups", points
+
+        # 1. Fetch latest news
+        logger.info("Fetching latest news...")
+        articles = self.news_fetcher.fetch_latest_news(
+            self.config.SYMBOL,
+            lookback_minutes=self.config.NEWS_CHECK_INTERVAL // 60
+        )
+
+        if not articles:
+            logger.info("No new articles found")
+            return None
+        return "articles", articles
+
+    def score_news(self, news, config, log=None):
+        """Aggregate sentiment of fetched news under config's window and confirmation weight"""
+        log = log or logger
+        kind, items = news
+        if kind == "rollups":
+            since = int(time.time()) - config.SENTIMENT_WINDOW_HOURS * 3600
+            points = [p for p in items if p["bucket"] >= since - since % 3600]
+            count = sum(p["count"] for p in points)
+            if not count:
+                return None
+            confirmations = sum(p["confirmations"] for p in points)
+            sentiment_score = weighted_score(points, config.SOURCE_CONFIRMATION_WEIGHT)
+            log.info(f"Aggregate sentiment score (rollups, {count} stories, "
+                     f"{confirmations} confirmations): {sentiment_score:.3f}")
+            return sentiment_score
+
+        # 2. Analyze sentiment
+        articles = items
+        log.info(f"Analyzing sentiment for {len(articles)} articles...")
+        weights = story_weights(articles, config.SOURCE_CONFIRMATION_WEIGHT)
+        scored = [(a["sentiment_score"], w) for a, w in zip(articles, weights)
+                  if a.get("sentiment_score") is not None]
+        if scored and sum(w for _, w in scored):
+            sentiment_score = sum(s * w for s, w in scored) / sum(w for _, w in scored)
+            log.info(f"Aggregate sentiment score (from API): {sentiment_score:.3f}")
+        else:
+            sentiment_score = self.sentiment_analyzer.aggregate_sentiment(
+                articles, confirmation_weight=config.SOURCE_CONFIRMATION_WEIGHT
+            )
+            log.info(f"Aggregate sentiment score (local VADER): {sentiment_score:.3f}")
+        return sentiment_score
+
+    def get_sentiment_score(self):
+        """Aggregate sentiment from the API rollups, falling back to raw articles"""
+        news = self.fetch_news()
+        return None if news is None else self.score_news(news, self.config)
+
     def run_trading_cycle(self):
         """Execute one trading cycle"""
         try:
-            # 1. Fetch latest news
-            logger.info("Fetching latest news...")
-            articles = self.news_fetcher.fetch_latest_news(
-                f"{self.config.SYMBOL} Exxon Mobil",
-                lookback_minutes=self.config.NEWS_CHECK_INTERVAL // 60
-            )
-
-            if not articles:
-                logger.info("No new articles found")
+            # 1-2. Aggregate sentiment
+            news = self.fetch_news()
+            if news is None:
+                return
+            sentiment_score = self.score_news(news, self.config)
+            if sentiment_score is None and not self.shadows:
                 return
-
-            # 2. Analyze sentiment
-            logger.info(f"Analyzing sentiment for {len(articles)} articles...")
-            scores = [a.get("sentiment_score") for a in articles if a.get("sentiment_score") is not None]
-            if scores:
-                sentiment_score = sum(scores) / len(scores)
-                logger.info(f"Aggregate sentiment score (from API): {sentiment_score:.3f}")
-            else:
-                sentiment_score = self.sentiment_analyzer.aggregate_sentiment(articles)
-                logger.info(f"Aggregate sentiment score (local VADER): {sentiment_score:.3f}")
 
             # 3. Get current price
             current_price = self.trader.get_current_price()
@@ -406,9 +654,12 @@ class QuantTradingBot:
                 return
 
             logger.info(f"Current price: ${current_price:.2f}")
+            timestamp = datetime.now().isoformat(timespec='seconds')
 
             # 4. Generate trading signal
-            signal, quantity = self.strategy.generate_signal(sentiment_score, current_price)
+            signal, quantity = None, 0
+            if sentiment_score is not None:
+                signal, quantity = self.strategy.generate_signal(sentiment_score, current_price)
 
             if signal and quantity > 0:
                 logger.info(f"Signal generated: {signal} {quantity} shares")
@@ -419,15 +670,44 @@ class QuantTradingBot:
 
                 if success:
                     self.strategy.record_trade(signal, quantity, current_price)
+                    self.primary_book.settle(signal, quantity, current_price)
+                    if self.journal:
+                        self.journal.add(self.primary_book, 'FILL', timestamp, current_price,
+                                         sentiment_score, signal, quantity)
                     logger.info(f"Trade successful! Position: {self.strategy.position}")
                 else:
                     logger.error("Trade execution failed")
             else:
                 logger.info("No signal generated or invalid quantity")
 
+            # 6. Paper-trade the shadow variants on the same inputs
+            self.run_shadows(news, sentiment_score, current_price, timestamp)
+
         except Exception as e:
             logger.error(f"Error in trading cycle: {e}", exc_info=True)
 
+    def run_shadows(self, news, sentiment_score, price, timestamp):
+        """Step every shadow variant on this cycle's news and price, then journal fills and marks
+
+        Variants sharing a sentiment window and confirmation weight share one score.
+        """
+        if not self.shadows:
+            return
+        self.last_price = price
+        scores = {(self.config.SENTIMENT_WINDOW_HOURS, self.config.SOURCE_CONFIRMATION_WEIGHT): sentiment_score}
+        for book in self.shadows:
+            key = (book.config.SENTIMENT_WINDOW_HOURS, book.config.SOURCE_CONFIRMATION_WEIGHT)
+            if key not in scores:
+                scores[key] = self.score_news(news, book.config, log=shadow_logger)
+            score = scores[key]
+            fill = book.step(score, price) if score is not None else None
+            if fill:
+                self.journal.add(book, 'FILL', timestamp, price, score, *fill)
+        for book in [self.primary_book] + self.shadows:
+            key = (book.config.SENTIMENT_WINDOW_HOURS, book.config.SOURCE_CONFIRMATION_WEIGHT)
+            self.journal.add(book, 'MARK', timestamp, price, scores[key])
+        self.journal.flush()
+
     def start(self):
         """Start the trading bot"""
         logger.info("=" * 50)
@@ -438,23 +718,34 @@ class QuantTradingBot:
         logger.info(f"Max position size: {self.config.MAX_POSITION_SIZE}")
         logger.info("=" * 50)
 
+        # The news API filters by symbol; an untagged one would never see an article
+        if self.config.SYMBOL not in SYMBOLS:
+            logger.error(f"{self.config.SYMBOL} has no news tagging rule (tracked: {', '.join(SYMBOLS)}). "
+                         f"Add it to SYMBOLS in sentiment_common.py and run: python scraper.py --reindex")
+            return
+
         # Connect to IB
         if not self.trader.connect():
             logger.error("Failed to connect to Interactive Brokers. Exiting.")
             return
 
         self.running = True
+        self._install_shutdown_handlers()
+        if install_signal_handlers('bot', self.memory):
+            logger.info(f"Profiling: kill -USR1 {os.getpid()} (CPU), kill -USR2 {os.getpid()} (memory), "
+                        f"kill -URG {os.getpid()} (stop memory tracing)")
 
         try:
             while self.running:
                 if self.is_market_open():
                     logger.info("Market is OPEN - Running trading cycle")
-                    self.run_trading_cycle()
+                    with self.slow_cycles.watch("trading cycle"):
+                        self.run_trading_cycle()
                 else:
                     logger.info("Market is CLOSED - Waiting...")
 
                 logger.info(f"Sleeping for {self.config.NEWS_CHECK_INTERVAL}s...")
-                time.sleep(self.config.NEWS_CHECK_INTERVAL)
+                self._wait(self.config.NEWS_CHECK_INTERVAL)
 
         except KeyboardInterrupt:
             logger.info("Keyboard interrupt received. Shutting down...")
@@ -463,6 +754,34 @@ class QuantTradingBot:
         finally:
             self.stop()
 
+    def _wait(self, seconds):
+        """Sleep between cycles, returning early once a stop is requested
+
+        Waits in one-second slices so signal handlers get to run on Windows too.
+        """
+        deadline = time.monotonic() + seconds
+        while not self.stop_requested.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            self.stop_requested.wait(min(remaining, 1.0))
+
+    def _install_shutdown_handlers(self):
+        """Stop after the current cycle on SIGTERM (and CTRL_BREAK on Windows)
+
+        A cycle may be waiting for an order to fill; interrupting it would leave
+        a live order that record_trade never saw. The cycle finishes, the wait
+        after it is cut short and stop() runs from start()'s finally.
+        """
+        def interrupt(signum, frame):
+            logger.info("Stop requested; finishing the current cycle...")
+            self.running = False
+            self.stop_requested.set()
+
+        for name in ('SIGTERM', 'SIGBREAK'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), interrupt)
+
     def stop(self):
         """Stop the trading bot"""
         logger.info("Stopping trading bot...")
@@ -470,10 +789,22 @@ class QuantTradingBot:
 
         # Save trade history
         if self.strategy.trades_history:
+            import pandas as pd
             df = pd.DataFrame(self.strategy.trades_history)
             df.to_csv('trade_history.csv', index=False)
             logger.info(f"Saved {len(self.strategy.trades_history)} trades to trade_history.csv")
 
+        # Shadow results (the journal has every fill and mark)
+        if self.shadows:
+            self.journal.flush()
+            if self.last_price is not None:
+                logger.info(f"Paper PnL at ${self.last_price:.2f} (journal: {self.config.SHADOW_JOURNAL}):")
+                books = sorted([self.primary_book] + self.shadows,
+                               key=lambda book: book.pnl(self.last_price), reverse=True)
+                for book in books:
+                    logger.info(f"  {book.name}: {book.pnl(self.last_price):+.2f} "
+                                f"over {book.fills} fills, position {book.strategy.position}")
+
         # Disconnect from IB
         self.trader.disconnect()
         logger.info("Trading bot stopped")
@@ -0,0 +1,272 @@
+"""Historical NewsAPI backfill into news.db
+
+Replaces the one-off fetch_news.py text dump: pages for several queries are
+fetched concurrently, each query resumes from the newest publishedAt already
+stored for it, and results are bulk-inserted into the same `articles` table
+the RSS scraper uses (deduplicated on url_hash, and clustered with
+near-duplicate stories like the scraper does).
+
+Usage:
+    python backfill_news.py                       # default queries
+    python backfill_news.py "Exxon Mobil" XOM Chevron
+    NEWSAPI_URL=http://127.0.0.1:9000/v2/everything python backfill_news.py XOM
+
+benchmarks/fixtures.NewsAPIServer is a local stand-in for NewsAPI (paging,
+`from`, 429s with Retry-After) to run it against.
+"""
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from scraper import DB_PATH, init_db, classify_article, index_article, published_epoch
+from rollups import update_rollups
+from dedup import StoryIndex, to_db
+
+# Point NEWSAPI_URL at a local mock to test without touching newsapi.org
+NEWSAPI_URL = os.environ.get('NEWSAPI_URL', 'https://newsapi.org/v2/everything')
+NEWS_API_KEY = os.environ.get('NEWS_API_KEY', '')
+
+DEFAULT_QUERIES = ['Exxon Mobil', 'XOM']
+PAGE_SIZE = 100             # Max per NewsAPI request
+MAX_PAGES = 5               # Per query and run
+MAX_WORKERS = 4             # Requests in flight at once
+MIN_REQUEST_INTERVAL = 0.2  # Seconds between request starts (all workers)
+MAX_RETRIES = 5
+
+
+class RateLimiter:
+    """Spaces out request starts across threads and honours Retry-After"""
+
+    def __init__(self, min_interval=MIN_REQUEST_INTERVAL):
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Hold back every worker for `seconds` (e.g. after a 429)"""
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+def init_backfill_state(conn):
+    """Per-query resume marker: newest publishedAt stored so far"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS backfill_state
+                    (query TEXT PRIMARY KEY,
+                     newest_published TEXT,
+                     updated_at TEXT)''')
+    conn.commit()
+
+
+def get_resume_point(conn, query):
+    row = conn.execute('SELECT newest_published FROM backfill_state WHERE query = ?',
+                       (query,)).fetchone()
+    return row[0] if row else None
+
+
+def retry_after(value, default):
+    """Seconds to wait per a Retry-After header (delta-seconds or an HTTP date), else default"""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def fetch_page(session, limiter, query, page, since=None, url=None):
+    """Fetch one page of results, retrying on rate limits and server errors"""
+    params = {
+        'q': query,
+        'sortBy': 'publishedAt',
+        'language': 'en',
+        'pageSize': PAGE_SIZE,
+        'page': page,
+    }
+    if since:
+        params['from'] = since
+
+    backoff = 1.0
+    for attempt in range(MAX_RETRIES):
+        limiter.wait()
+        resp = session.get(url or NEWSAPI_URL, params=params,
+                           headers={'X-Api-Key': NEWS_API_KEY}, timeout=15)
+
+        if resp.status_code == 429 or resp.status_code >= 500:
+            delay = retry_after(resp.headers.get('Retry-After'), backoff)
+            print(f"  ⏳ {query} p{page}: HTTP {resp.status_code}, retrying in {delay:.1f}s")
+            limiter.pause(delay)
+            backoff = min(backoff * 2, 60)
+            continue
+
+        data = resp.json()
+        if data.get('status') == 'error':
+            if data.get('code') == 'rateLimited':
+                limiter.pause(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+            raise RuntimeError(f"{data.get('code')}: {data.get('message')}")
+        resp.raise_for_status()
+        return data
+
+    raise RuntimeError(f"gave up after {MAX_RETRIES} attempts")
+
+
+def store_articles(conn, articles):
+    """Score and insert NewsAPI articles in one transaction; returns number of new rows"""
+    by_hash = {}
+    for article in articles:
+        url = article.get('url') or ''
+        if url:
+            by_hash[hashlib.md5(url.encode()).hexdigest()] = article
+
+    # Skip rows we already have before spending time on sentiment
+    hashes = list(by_hash)
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        for (existing,) in conn.execute(
+                f'SELECT url_hash FROM articles WHERE url_hash IN ({placeholders})', chunk):
+            by_hash.pop(existing, None)
+
+    if not by_hash:
+        return 0
+
+    fetched_at = datetime.now().isoformat()
+    published_ts = {url_hash: published_epoch(article.get('publishedAt', ''), fetched_at)
+                    for url_hash, article in by_hash.items()}
+    stories = StoryIndex.load(conn, min(published_ts.values()), max(published_ts.values()))
+
+    new_count = 0
+    new_items = []
+    for url_hash, article in by_hash.items():
+        title = article.get('title') or ''
+        summary = article.get('description') or ''
+        source = ((article.get('source') or {}).get('name') or 'newsapi').lower()
+        ts = published_ts[url_hash]
+        # Near-duplicates of a stored story reuse its sentiment instead of being re-scored
+        fingerprint, cluster_id, score, label = classify_article(stories, title, summary, ts)
+        cur = conn.execute('''INSERT INTO articles
+                              (url_hash, title, summary, url, source, published,
+                               sentiment_score, sentiment_label, fetched_at, published_ts,
+                               cluster_id, simhash)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                              ON CONFLICT(url_hash) DO NOTHING''',
+                           (url_hash, title, summary[:500], article['url'], source,
+                            article.get('publishedAt', ''), score, label, fetched_at, ts,
+                            cluster_id, to_db(fingerprint) if fingerprint is not None else None))
+        if cur.rowcount:
+            new_count += 1
+            new_items.append(index_article(conn, stories, cur.lastrowid, title, summary[:500], source,
+                                           ts, score, label, fingerprint, cluster_id))
+    update_rollups(conn, [item for item in new_items if item is not None])
+    return new_count
+
+
+def save_resume_point(conn, query, articles, previous):
+    newest = max((a.get('publishedAt') or '' for a in articles), default='')
+    if previous and previous > newest:
+        newest = previous
+    if newest:
+        conn.execute('''INSERT INTO backfill_state (query, newest_published, updated_at)
+                        VALUES (?, ?, ?)
+                        ON CONFLICT(query) DO UPDATE SET
+                            newest_published = excluded.newest_published,
+                            updated_at = excluded.updated_at''',
+                     (query, newest, datetime.now().isoformat()))
+
+
+def backfill(queries, max_pages=MAX_PAGES, max_workers=MAX_WORKERS, since=None, db_path=None, url=None):
+    """Backfill every query; returns {query: new_article_count}"""
+    db_path = db_path or DB_PATH
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    init_backfill_state(conn)
+
+    resume = {q: get_resume_point(conn, q) or since for q in queries}
+    collected = {q: [] for q in queries}
+    pending = {q: 0 for q in queries}
+    results = {}
+
+    session = requests.Session()
+    limiter = RateLimiter()
+
+    def finish(query):
+        new = store_articles(conn, collected[query])
+        save_resume_point(conn, query, collected[query], resume[query])
+        conn.commit()
+        results[query] = new
+        print(f"✓ {query}: {len(collected[query])} fetched, {new} new")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for q in queries:
+            futures[pool.submit(fetch_page, session, limiter, q, 1, resume[q], url)] = (q, 1)
+            pending[q] += 1
+
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for fut in done:
+                query, page = futures.pop(fut)
+                pending[query] -= 1
+                try:
+                    data = fut.result()
+                except Exception as e:
+                    # Later pages past the plan's result cap error out; keep what we have
+                    print(f"✗ {query} page {page} failed: {e}")
+                    data = {}
+
+                articles = data.get('articles', [])
+                collected[query].extend(articles)
+
+                if page == 1 and articles:
+                    total = data.get('totalResults', len(articles))
+                    last_page = min(max_pages, -(-total // PAGE_SIZE))
+                    for p in range(2, last_page + 1):
+                        futures[pool.submit(fetch_page, session, limiter, query, p,
+                                            resume[query], url)] = (query, p)
+                        pending[query] += 1
+
+                # Write each query as soon as its last page lands
+                if pending[query] == 0:
+                    finish(query)
+
+    conn.close()
+    print(f"\n→ Backfill stored {sum(results.values())} new articles\n")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill NewsAPI history into news.db')
+    parser.add_argument('queries', nargs='*', default=DEFAULT_QUERIES)
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--since', help='ISO date for queries without a resume point')
+    args = parser.parse_args()
+
+    if not NEWS_API_KEY and NEWSAPI_URL.startswith('https://newsapi.org'):
+        print("Set NEWS_API_KEY in the environment first.")
+        sys.exit(1)
+
+    backfill(args.queries, max_pages=args.max_pages, max_workers=args.workers, since=args.since)
@@ -0,0 +1,160 @@
+"""Local columnar store for historical bars (filled by ib_backfill.py)
+
+One directory per symbol and bar size, e.g. bars/XOM/1min/, holding:
+
+    manifest.json          current version, row count, time range and the
+                           request windows already fetched (as merged ranges)
+    v3/ts.npy, open.npy,   one NumPy array per column, sorted by ts (epoch
+    high.npy, low.npy,     seconds, UTC); np.load(..., mmap_mode='r') maps
+    close.npy, volume.npy  them without reading the file
+    segments/*.npz         windows fetched since the last compaction
+
+A fetched window is written as its own segment, so an interrupted backfill
+keeps everything it downloaded. compact() merges the segments into a new
+version directory and then swaps manifest.json, so readers always see a
+complete version.
+"""
+import os
+import json
+import glob
+import bisect
+import numpy as np
+
+BAR_DIR = os.environ.get('BAR_DIR', 'bars')
+
+COLUMNS = ('ts', 'open', 'high', 'low', 'close', 'volume')
+DTYPES = {'ts': np.int64, 'open': np.float64, 'high': np.float64, 'low': np.float64,
+          'close': np.float64, 'volume': np.float64}
+
+
+def store_path(symbol, bar_size, root=None):
+    """bars/<SYMBOL>/<bar size without spaces>, e.g. bars/XOM/1min"""
+    return os.path.join(root or BAR_DIR, symbol.upper(), bar_size.replace(' ', ''))
+
+
+def empty_columns():
+    return {c: np.empty(0, dtype=DTYPES[c]) for c in COLUMNS}
+
+
+def _merge_range(ranges, start, end):
+    """Insert [start, end) into sorted, non-overlapping ranges, joining touching ones"""
+    merged = []
+    for lo, hi in sorted(ranges + [[start, end]]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+class BarStore:
+    def __init__(self, path):
+        self.path = path
+        self.segments = os.path.join(path, 'segments')
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(os.path.join(self.path, 'manifest.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': 0, 'rows': 0, 'first_ts': None, 'last_ts': None, 'completed': []}
+
+    def _segment_files(self):
+        return sorted(glob.glob(os.path.join(self.segments, '*.npz')), key=os.path.getmtime)
+
+    def completed(self):
+        """Fetched windows as merged [start, end) ranges, compacted or not"""
+        ranges = [list(r) for r in self.manifest['completed']]
+        for path in self._segment_files():
+            name = os.path.basename(path)[:-len('.npz')]
+            if not name.endswith('.partial'):
+                start, end = map(int, name.split('_'))
+                ranges = _merge_range(ranges, start, end)
+        return ranges
+
+    @staticmethod
+    def covers(ranges, start, end):
+        """True if [start, end) lies inside one of ranges (from completed())"""
+        i = bisect.bisect_right([lo for lo, _ in ranges], start) - 1
+        return i >= 0 and ranges[i][1] >= end
+
+    def write_segment(self, start, end, columns, complete=True):
+        """Save one fetched window; incomplete windows (still in progress) are re-fetched next run"""
+        os.makedirs(self.segments, exist_ok=True)
+        name = f"{start}_{end}" + ('' if complete else '.partial')
+        tmp = os.path.join(self.segments, name + '.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, **{c: np.asarray(columns[c], dtype=DTYPES[c]) for c in COLUMNS})
+        os.replace(tmp, os.path.join(self.segments, name + '.npz'))
+
+    def read(self, since=None, until=None, mmap=True):
+        """Columns for bars with since <= ts < until, memory-mapped unless mmap=False"""
+        version = self.manifest['version']
+        if not version or not self.manifest['rows']:
+            return empty_columns()
+        folder = os.path.join(self.path, f"v{version}")
+        mode = 'r' if mmap else None
+        columns = {c: np.load(os.path.join(folder, f"{c}.npy"), mmap_mode=mode) for c in COLUMNS}
+        ts = columns['ts']
+        lo = 0 if since is None else int(np.searchsorted(ts, since, 'left'))
+        hi = len(ts) if until is None else int(np.searchsorted(ts, until, 'left'))
+        return {c: values[lo:hi] for c, values in columns.items()}
+
+    def compact(self):
+        """Merge segments into a new version; returns the number of segments merged"""
+        segments = self._segment_files()
+        if not segments:
+            return 0
+        parts = [self.read(mmap=False)]
+        completed = [list(r) for r in self.manifest['completed']]
+        for path in segments:
+            with np.load(path) as data:
+                parts.append({c: data[c] for c in COLUMNS})
+            name = os.path.basename(path)[:-len('.npz')]
+            if not name.endswith('.partial'):
+                completed = _merge_range(completed, *map(int, name.split('_')))
+
+        merged = {c: np.concatenate([p[c] for p in parts]) for c in COLUMNS}
+        # Sort by time; where windows overlap, the later fetch of a bar wins
+        order = np.argsort(merged['ts'], kind='stable')
+        ts = merged['ts'][order]
+        last = np.append(ts[1:] != ts[:-1], True)
+        keep = order[last]
+
+        version = self.manifest['version'] + 1
+        folder = os.path.join(self.path, f"v{version}")
+        os.makedirs(folder, exist_ok=True)
+        for c in COLUMNS:
+            np.save(os.path.join(folder, f"{c}.npy"), merged[c][keep])
+
+        rows = len(keep)
+        manifest = {'version': version, 'rows': rows,
+                    'first_ts': int(merged['ts'][keep[0]]) if rows else None,
+                    'last_ts': int(merged['ts'][keep[-1]]) if rows else None,
+                    'completed': completed}
+        tmp = os.path.join(self.path, 'manifest.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(self.path, 'manifest.json'))
+        self.manifest = manifest
+
+        for path in segments:
+            os.remove(path)
+        self._remove_old_versions()
+        return len(segments)
+
+    def _remove_old_versions(self):
+        for folder in glob.glob(os.path.join(self.path, 'v*')):
+            if folder != os.path.join(self.path, f"v{self.manifest['version']}"):
+                try:
+                    for name in os.listdir(folder):
+                        os.remove(os.path.join(folder, name))
+                    os.rmdir(folder)
+                except OSError:
+                    pass    # still mapped by a reader (Windows); removed next time
+
+
+def load(symbol, bar_size, since=None, until=None, root=None):
+    """Memory-mapped columns of a symbol's stored bars in [since, until)"""
+    return BarStore(store_path(symbol, bar_size, root)).read(since, until)
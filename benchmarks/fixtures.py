@@ -0,0 +1,384 @@
+"""Synthetic, offline stand-ins for the benchmark suite
+
+Everything here is generated from a fixed seed so runs are comparable:
+RSS feeds and a NewsAPI stand-in served from local HTTP servers, a
+populated news.db, article dicts in the shape the bot uses, daily
+price/sentiment series and a simulated IB historical data endpoint.
+"""
+import os
+import math
+import time
+import json
+import asyncio
+import calendar
+import random
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from email.utils import format_datetime
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+SOURCES = ['bloomberg', 'reuters', 'cnbc']
+
+# Bump when the articles schema changes so cached databases are rebuilt
+SCHEMA_VERSION = 5
+
+_SUBJECTS = ['Exxon Mobil', 'XOM', 'Chevron', 'Oil prices', 'OPEC', 'The Fed', 'Crude futures',
+             'Energy stocks', 'Shell', 'Natural gas', 'Refiners', 'Wall Street']
+_VERBS = ['surge', 'slump', 'rally', 'fall', 'beat expectations', 'miss estimates',
+          'face lawsuit', 'announce merger', 'raise dividend', 'cut guidance', 'hold steady']
+_TAILS = ['after earnings report', 'amid supply fears', 'as analyst upgrades outlook',
+          'on regulation concerns', 'following CEO comments', 'in volatile trading',
+          'despite strong revenue', 'after investigation news', 'on partnership deal']
+
+_BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def headline(rng):
+    return f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_TAILS)}"
+
+
+def summary(rng):
+    return ' '.join(headline(rng) + '.' for _ in range(rng.randint(2, 5)))
+
+
+def make_rss(source, n, seed=0):
+    """RSS 2.0 document with n items, newest first"""
+    rng = random.Random(f"{source}-{seed}")
+    items = []
+    for i in range(n):
+        published = _BASE_TIME + timedelta(minutes=seed * n + n - i)
+        items.append(f"""<item>
+<title>{headline(rng)}</title>
+<link>https://{source}.example.com/{seed}/{i}</link>
+<description>{summary(rng)}</description>
+<pubDate>{format_datetime(published)}</pubDate>
+</item>""")
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel>
+<title>{source} synthetic</title>
+<link>https://{source}.example.com/</link>
+<description>Synthetic feed for benchmarks</description>
+{''.join(items)}
+</channel></rss>""".encode('utf-8')
+
+
+class RSSServer:
+    """Local HTTP server serving /<source>.rss from make_rss
+
+    with RSSServer(SOURCES, items=20) as server:
+        feeds = server.feeds   # {source: url}
+    """
+
+    def __init__(self, sources, items=20):
+        documents = {f"/{source}.rss": make_rss(source, items) for source in sources}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = documents.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/rss+xml')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        host, port = self.httpd.server_address
+        self.feeds = {source: f"http://{host}:{port}/{source}.rss" for source in sources}
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class NewsAPIServer:
+    """Local stand-in for NewsAPI's /v2/everything (see backfill_news.py)
+
+    Each query has `total` synthetic articles, one a minute, served newest
+    first in pages of pageSize and filtered by `from`. The first `throttle`
+    requests get HTTP 429 with Retry-After as an HTTP date one second out.
+
+    with NewsAPIServer(total=300) as server:
+        backfill(['XOM'], url=server.url, db_path=...)
+    """
+
+    def __init__(self, total=300, throttle=0):
+        state = {'requests': 0}
+        self.state = state
+
+        def articles(query, since):
+            rng = random.Random(query)
+            items = []
+            for i in range(total):
+                published = (_BASE_TIME + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+                item = {'source': {'id': None, 'name': rng.choice(SOURCES)},
+                        'title': headline(rng), 'description': summary(rng),
+                        'url': f"https://newsapi.example.com/{query}/{i}",
+                        'publishedAt': published}
+                if not since or published >= since:
+                    items.append(item)
+            return items[::-1]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != '/v2/everything':
+                    self.send_error(404)
+                    return
+                state['requests'] += 1
+                if state['requests'] <= throttle:
+                    retry = datetime.now(timezone.utc) + timedelta(seconds=1)
+                    self.send_response(429)
+                    self.send_header('Retry-After', format_datetime(retry, usegmt=True))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                found = articles(params.get('q', ''), params.get('from'))
+                size = int(params.get('pageSize', 100))
+                page = int(params.get('page', 1))
+                body = json.dumps({'status': 'ok', 'totalResults': len(found),
+                                   'articles': found[(page - 1) * size:page * size]}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        host, port = self.httpd.server_address
+        self.url = f"http://{host}:{port}/v2/everything"
+
+    @property
+    def requests(self):
+        return self.state['requests']
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def article_rows(n, seed=0):
+    """Rows for the articles table, oldest first"""
+    rng = random.Random(seed)
+    labels = ['positive', 'negative', 'neutral']
+    for i in range(n):
+        published = _BASE_TIME + timedelta(seconds=30 * i)
+        url = f"https://news.example.com/{seed}/{i}"
+        score = round(rng.uniform(-1, 1), 4)
+        label = labels[0] if score >= 0.05 else labels[1] if score <= -0.05 else labels[2]
+        yield (hashlib.md5(url.encode()).hexdigest(),
+               headline(rng),
+               summary(rng)[:500],
+               url,
+               rng.choice(SOURCES),
+               format_datetime(published),
+               score,
+               label,
+               published.replace(tzinfo=None).isoformat(),
+               int(published.timestamp()))
+
+
+def build_news_db(n, init_db, index=None):
+    """Return the path of a cached news.db holding n synthetic articles
+
+    init_db(path) must create the schema; rows are bulk-loaded afterwards and
+    index(conn), if given, then fills any derived tables.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"news_{n}_v{SCHEMA_VERSION}.db")
+    if os.path.exists(path):
+        conn = sqlite3.connect(path)
+        try:
+            if conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0] == n:
+                return path
+        except sqlite3.Error:
+            pass
+        finally:
+            conn.close()
+        os.remove(path)
+
+    init_db(path)
+    conn = sqlite3.connect(path)
+    conn.executemany('''INSERT INTO articles
+                        (url_hash, title, summary, url, source, published,
+                         sentiment_score, sentiment_label, fetched_at, published_ts)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', article_rows(n))
+    if index is not None:
+        index(conn)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def bot_articles(n, seed=0):
+    """Articles in the dict shape NewsFetcher.fetch_latest_news returns"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    return [{
+        'title': headline(rng),
+        'description': summary(rng),
+        'url': f"https://news.example.com/{i}",
+        'publishedAt': (now - timedelta(minutes=rng.randint(0, 48 * 60))).isoformat(),
+        'source': {'name': rng.choice(SOURCES)},
+        'sentiment_score': None,
+        'sentiment_label': None,
+    } for i in range(n)]
+
+
+def price_walk(n, start=100.0, seed=0):
+    """Geometric random walk of n prices"""
+    rng = random.Random(seed)
+    prices = [start]
+    for _ in range(n - 1):
+        prices.append(prices[-1] * (1 + rng.gauss(0, 0.01)))
+    return prices
+
+
+def daily_frames(days, seed=0):
+    """(prices_use, sentiment_df) DataFrames in the backtest's input shape"""
+    import pandas as pd
+    rng = random.Random(seed)
+    dates = pd.bdate_range('2015-01-01', periods=days)
+    prices = pd.DataFrame({'date': dates, 'close': price_walk(days, seed=seed)})
+    pos = [rng.randint(0, 10) for _ in range(days)]
+    neg = [rng.randint(0, 10) for _ in range(days)]
+    sentiment = pd.DataFrame({'date': dates, 'pos': pos, 'neg': neg,
+                              'neu': [rng.randint(0, 5) for _ in range(days)],
+                              'sentiment_score': [p - q for p, q in zip(pos, neg)]})
+    return prices, sentiment
+
+
+class _Event:
+    """The += / -= / emit subset of an ib_insync event"""
+
+    def __init__(self):
+        self.handlers = []
+
+    def __iadd__(self, handler):
+        self.handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        self.handlers.remove(handler)
+        return self
+
+    def emit(self, *args):
+        for handler in list(self.handlers):
+            handler(*args)
+
+
+class _Bars(list):
+    reqId = None
+
+
+_DURATION_UNITS = {'S': 1, 'D': 86400, 'W': 7 * 86400}
+
+
+class SimulatedIB:
+    """Stand-in for ib_insync.IB's historical data API with IB's pacing rules
+
+    Serves deterministic bars for US regular hours (14:30-21:00 UTC,
+    weekdays) after `latency` seconds. Requests breaking the pacing limits
+    (which can be scaled down to keep benchmarks short) get error 162
+    "pacing violation" and no bars, like TWS; empty windows get 162 "no
+    data". violations counts the former.
+    """
+
+    def __init__(self, latency=0.01, limit=60, window=600.0, burst=5, burst_window=2.0,
+                 max_in_flight=50):
+        self.latency = latency
+        self.limit, self.window = limit, window
+        self.burst, self.burst_window = burst, burst_window
+        self.max_in_flight = max_in_flight
+        self.errorEvent = _Event()
+        self.requests = []
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.violations = 0
+        self._req_ids = iter(range(1, 1 << 31))
+
+    def _paced(self, now):
+        recent = [t for t in self.requests if t > now - self.window]
+        burst = [t for t in recent if t > now - self.burst_window]
+        return len(recent) < self.limit and len(burst) < self.burst and self.in_flight < self.max_in_flight
+
+    @staticmethod
+    def _bar_seconds(bar_size):
+        n, unit = bar_size.split()
+        return None if unit.startswith('day') else int(n) * {'sec': 1, 'min': 60, 'hou': 3600}[unit[:3]]
+
+    @staticmethod
+    def _price(ts):
+        return 100 * math.exp(0.2 * math.sin(ts / 2e6)) + (ts * 2654435761 % 1000) / 1e3
+
+    def bars(self, end, seconds, bar_size):
+        step = self._bar_seconds(bar_size)
+        bars = []
+        for day in range((end - seconds) // 86400, (end - 1) // 86400 + 1):
+            if datetime.fromtimestamp(day * 86400, timezone.utc).weekday() >= 5:
+                continue
+            if step is None:
+                times = [day * 86400] if end - seconds <= day * 86400 < end else []
+            else:
+                open_ = day * 86400 + 14 * 3600 + 1800
+                times = range(max(open_, end - seconds), min(open_ + 23400, end), step)
+                times = [t for t in times if (t - open_) % step == 0]
+            for ts in times:
+                close = self._price(ts)
+                bars.append(SimpleNamespace(
+                    date=datetime.fromtimestamp(ts, timezone.utc).date() if step is None
+                    else datetime.fromtimestamp(ts, timezone.utc),
+                    open=close - 0.05, high=close + 0.1, low=close - 0.1, close=close,
+                    volume=float(ts % 5000)))
+        return bars
+
+    async def reqHistoricalDataAsync(self, contract, endDateTime, durationStr, barSizeSetting,
+                                     whatToShow, useRTH, formatDate=1, keepUpToDate=False,
+                                     chartOptions=(), timeout=60):
+        result = _Bars()
+        result.reqId = next(self._req_ids)
+        now = time.monotonic()
+        if not self._paced(now):
+            self.violations += 1
+            self.requests.append(now)
+            await asyncio.sleep(self.latency)
+            self.errorEvent.emit(result.reqId, 162, 'Historical Market Data Service error '
+                                 'message:Historical data request pacing violation', contract)
+            return result
+        self.requests.append(now)
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            n, unit = durationStr.split()
+            end = calendar.timegm(endDateTime.utctimetuple())
+            result.extend(self.bars(end, int(n) * _DURATION_UNITS[unit], barSizeSetting))
+        finally:
+            self.in_flight -= 1
+        if not result:
+            self.errorEvent.emit(result.reqId, 162, 'Historical Market Data Service error '
+                                 'message:HMDS query returned no data', contract)
+        return result
@@ -0,0 +1,628 @@
+"""Benchmark suite for the ingest, API, sentiment, strategy, backtest and bar backfill hot paths
+
+Runs entirely offline against the synthetic fixtures in fixtures.py; the
+startup group times fresh interpreters importing each entry point. Results
+are compared with benchmarks/baseline.json and any benchmark slower than the
+baseline by more than --threshold is reported as a regression (exit code 1).
+
+--check runs scripted scenarios against the same local stand-ins (NewsAPI,
+IB) instead, and fails (exit code 1) if the backfills misbehave: rate limits
+not retried, resumed runs refetching or storing duplicates, pacing violations
+not recovered from, stored windows fetched again.
+
+Usage (from the project root):
+    python benchmarks/run_benchmarks.py                  # compare with baseline
+    python benchmarks/run_benchmarks.py --save-baseline  # record a new baseline
+    python benchmarks/run_benchmarks.py --quick          # skip the 1M-row database
+    python benchmarks/run_benchmarks.py --only api sentiment
+    python benchmarks/run_benchmarks.py --check          # behaviour checks, no timing
+"""
+import os
+import sys
+import io
+import json
+import time
+import types
+import random
+import socket
+import logging
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep imports of the app modules away from the real news.db
+_SCRATCH = tempfile.mkdtemp(prefix='exon-bench-')
+os.environ.setdefault('NEWS_DB', os.path.join(_SCRATCH, 'news.db'))
+
+import fixtures
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.20   # 20% slower than baseline counts as a regression
+
+BENCHMARKS = []
+CHECKS = []
+
+
+def benchmark(name, group, unit):
+    """Register fn() -> (elapsed_seconds, operations[, note]) under name"""
+    def register(fn):
+        BENCHMARKS.append({'name': name, 'group': group, 'unit': unit, 'fn': fn})
+        return fn
+    return register
+
+
+def check(name, group):
+    """Register fn() -> note as a --check scenario; fn calls expect() for each outcome"""
+    def register(fn):
+        CHECKS.append({'name': name, 'group': group, 'fn': fn})
+        return fn
+    return register
+
+
+class CheckFailed(Exception):
+    pass
+
+
+def expect(ok, message):
+    if not ok:
+        raise CheckFailed(message)
+
+
+def best_of(fn, repeat):
+    """Lowest seconds-per-operation over `repeat` runs, and the last run's note"""
+    best = note = None
+    for _ in range(repeat):
+        elapsed, ops, *extra = fn()
+        per_op = elapsed / ops
+        best = per_op if best is None else min(best, per_op)
+        note = extra[0] if extra else None
+    return best, note
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+# ============================================
+# INGEST
+# ============================================
+@benchmark('fetch_and_store', 'ingest', 'article')
+def bench_fetch_and_store():
+    import sqlite3
+    import scraper
+    import feeds
+    items = 20
+    with fixtures.RSSServer(fixtures.SOURCES, items=items) as server:
+        original = scraper.DB_PATH
+        scraper.DB_PATH = os.path.join(_SCRATCH, f"ingest_{time.time_ns()}.db")
+        try:
+            scraper.init_db()
+            conn = sqlite3.connect(scraper.DB_PATH)
+            feeds.init_feeds(conn)
+            conn.execute('DELETE FROM feeds')
+            for name, url in server.feeds.items():
+                feeds.add_feed(conn, name, url)
+            conn.commit()
+            conn.close()
+            with contextlib.redirect_stdout(io.StringIO()):
+                elapsed = timed(scraper.fetch_and_store)
+        finally:
+            os.remove(scraper.DB_PATH)
+            scraper.DB_PATH = original
+    return elapsed, items * len(fixtures.SOURCES)
+
+
+@benchmark('feed_poll_200', 'ingest', 'feed')
+def bench_feed_poll():
+    """Adaptive scheduler's first pass over 200 feeds (20 items each) on one host"""
+    import sqlite3
+    import scraper
+    import feeds
+    from scheduler import FeedScheduler
+    sources = [f"feed{i}" for i in range(200)]
+    path = os.path.join(_SCRATCH, f"poll_{time.time_ns()}.db")
+    with fixtures.RSSServer(sources, items=20) as server:
+        scraper.init_db(path)
+        conn = sqlite3.connect(path)
+        feeds.init_feeds(conn)
+        conn.execute('DELETE FROM feeds')
+        for name, url in server.feeds.items():
+            feeds.add_feed(conn, name, url)
+        conn.commit()
+        conn.close()
+
+        scheduler = FeedScheduler(db_path=path)
+        stop = threading.Event()
+        thread = threading.Thread(target=scheduler.run, args=(stop,), daemon=True)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            thread.start()
+            while len(scheduler.feeds) < len(sources) or not all(
+                    f['last_polled'] for f in list(scheduler.feeds.values())):
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            stop.set()
+            thread.join()
+    os.remove(path)
+    return elapsed, len(sources)
+
+
+@benchmark('newsapi_backfill', 'ingest', 'article')
+def bench_newsapi_backfill():
+    import backfill_news
+    queries = ['XOM', 'Exxon Mobil']
+    db_path = os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'news.db')
+    with fixtures.NewsAPIServer(total=300) as server, contextlib.redirect_stdout(io.StringIO()):
+        elapsed = timed(backfill_news.backfill, queries, max_pages=3, db_path=db_path, url=server.url)
+    return elapsed, 300 * len(queries), f"{server.requests} requests"
+
+
+@benchmark('story_match_10k', 'ingest', 'article')
+def bench_story_match():
+    """Near-duplicate lookup against a window of 10k recent articles"""
+    from dedup import StoryIndex, simhash
+    rows = list(fixtures.article_rows(11_000))
+    stories = StoryIndex(window=10 ** 9)
+    for i, row in enumerate(rows[:10_000]):
+        stories.add(simhash(f"{row[1]} {row[2]}"), row[9], i, row[4], row[6], row[7])
+    fingerprints = [(simhash(f"{row[1]} {row[2]}"), row[9]) for row in rows[10_000:]]
+    return timed(lambda: [stories.match(fp, ts) for fp, ts in fingerprints]), len(fingerprints)
+
+
+# ============================================
+# API
+# ============================================
+def _api_on(rows):
+    import scraper
+    import api
+    path = fixtures.build_news_db(rows, scraper.init_db, index=scraper.rebuild_symbol_index)
+    scraper.DB_PATH = api.DB_PATH = path
+    return api
+
+
+# Handlers are called directly, with a JSON-accepting request and a response to set status on
+_JSON_REQUEST = types.SimpleNamespace(headers={'accept': 'application/json'})
+_RESPONSE = types.SimpleNamespace(status_code=200)
+
+
+def _api_bench(rows, call, requests=50):
+    api = _api_on(rows)
+    return timed(lambda: [call(api) for _ in range(requests)]), requests
+
+
+for _rows, _label in ((10_000, '10k'), (1_000_000, '1m')):
+    benchmark(f'api_latest_{_label}', 'api', 'request')(
+        lambda rows=_rows: _api_bench(rows, lambda api: api.get_news(_JSON_REQUEST, _RESPONSE, limit=20)))
+    benchmark(f'api_search_{_label}', 'api', 'request')(
+        lambda rows=_rows: _api_bench(rows, lambda api: api.search_news(_JSON_REQUEST, _RESPONSE, query='Exxon',
+                                                                          limit=20)))
+
+
+_server_url = None
+
+
+def _api_server():
+    """Base URL of the API served over HTTP (started once, on the 10k database)"""
+    global _server_url
+    if _server_url is None:
+        import uvicorn
+        api = _api_on(10_000)
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(api.app, host='127.0.0.1', port=port, log_level='error'))
+        threading.Thread(target=server.run, daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        _server_url = f"http://127.0.0.1:{port}"
+    return _server_url
+
+
+def _fetch_bench(get, requests=50):
+    """Time `requests` fetch+decode round trips; note the response size"""
+    get()  # warm the connection
+    start = time.perf_counter()
+    for _ in range(requests):
+        size = get()
+    return time.perf_counter() - start, requests, f"{size:,} B/response"
+
+
+@benchmark('api_fetch_full', 'payload', 'request')
+def bench_fetch_full():
+    """What the bot used to do: every field of the newest 20 articles, plain JSON"""
+    import requests as http
+    url = f"{_api_server()}/news/latest"
+
+    def get():
+        resp = http.get(url, params={'limit': 20}, headers={'Accept-Encoding': 'identity'}, timeout=10)
+        resp.json()
+        return len(resp.content)
+
+    return _fetch_bench(get)
+
+
+@benchmark('api_fetch_compact', 'payload', 'request')
+def bench_fetch_compact():
+    """NewsFetcher today: symbol filter, only the fields it reads, msgpack/orjson, gzip"""
+    from automated_trading_bot import NewsFetcher
+    fetcher = NewsFetcher(_api_server())
+    url = f"{fetcher.api_base_url}/news/latest"
+    params = {'limit': 20, 'symbol': 'XOM', 'fields': NewsFetcher.ARTICLE_FIELDS}
+
+    def get():
+        resp = fetcher.session.get(url, params=params, timeout=10)
+        fetcher._decode(resp)
+        return int(resp.headers.get('content-length', len(resp.content)))
+
+    return _fetch_bench(get)
+
+
+# ============================================
+# SENTIMENT
+# ============================================
+@benchmark('sentiment_analyze', 'sentiment', 'article')
+def bench_analyze():
+    from automated_trading_bot import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    texts = [a['title'] + ' ' + a['description'] for a in fixtures.bot_articles(1000)]
+    return timed(lambda: [analyzer.analyze(t) for t in texts]), len(texts)
+
+
+@benchmark('aggregate_sentiment', 'sentiment', 'article')
+def bench_aggregate():
+    from automated_trading_bot import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    articles = fixtures.bot_articles(1000)
+    return timed(analyzer.aggregate_sentiment, articles), len(articles)
+
+
+# ============================================
+# STRATEGY
+# ============================================
+@benchmark('generate_signal', 'strategy', 'signal')
+def bench_generate_signal():
+    from automated_trading_bot import Config, TradingStrategy
+    strategy = TradingStrategy(Config())
+    rng = random.Random(0)
+    prices = fixtures.price_walk(100_000)
+    scores = [rng.uniform(-0.6, 0.6) for _ in prices]
+
+    def run():
+        for score, price in zip(scores, prices):
+            signal, quantity = strategy.generate_signal(score, price)
+            if signal and quantity > 0:
+                strategy.record_trade(signal, quantity, price)
+                strategy.daily_trades = 0
+                strategy.trades_history.clear()
+
+    return timed(run), len(prices)
+
+
+@benchmark('shadow_cycle_20', 'strategy', 'cycle')
+def bench_shadow_cycle():
+    from automated_trading_bot import (Config, QuantTradingBot, ShadowBook, ShadowJournal,
+                                       TradingStrategy, variant_config)
+    bot = QuantTradingBot.__new__(QuantTradingBot)    # skip IBTrader: no connection needed
+    bot.config = Config()
+    bot.sentiment_analyzer = None
+    bot.strategy = TradingStrategy(bot.config)
+    bot.primary_book = ShadowBook('primary', bot.config, bot.strategy)
+    bot.shadows = [ShadowBook(f"v{i}", variant_config(bot.config, {
+        'BUY_THRESHOLD': 0.02 * i, 'SELL_THRESHOLD': -0.02 * i,
+        'SENTIMENT_WINDOW_HOURS': (6, 24, 72)[i % 3]})) for i in range(20)]
+    bot.journal = ShadowJournal(os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'shadow_journal.csv'))
+    bot.last_price = None
+
+    rng = random.Random(0)
+    now = int(time.time())
+    points = [{'bucket': now - now % 3600 - 3600 * h, 'count': 3, 'confirmations': 1,
+               'score_sum': rng.uniform(-3, 3), 'confirmed_score_sum': rng.uniform(-1, 1)}
+              for h in range(72)]
+    prices = fixtures.price_walk(1000)
+    scores = [rng.uniform(-0.6, 0.6) for _ in prices]
+
+    def run():
+        for score, price in zip(scores, prices):
+            bot.run_shadows(('rollups', points), score, price, '2025-01-01T00:00:00')
+        for book in bot.shadows:
+            book.strategy.daily_trades = 0
+
+    return timed(run), len(prices), f"{len(bot.shadows)} variants, journal included"
+
+
+# ============================================
+# BARS
+# ============================================
+@benchmark('ib_backfill_sim', 'bars', 'window')
+def bench_ib_backfill():
+    from ib_backfill import Pacer, backfill
+    from bar_store import BarStore
+    # Pacing limits high enough that the scheduler and store, not IB's rules, set the pace
+    limits = dict(limit=100_000, window=600, burst=100_000, burst_window=2.0, max_in_flight=50)
+    ib = fixtures.SimulatedIB(latency=0.02, **limits)
+    store = BarStore(os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'XOM', '1min'))
+    start = 1704067200                      # 2024-01-01
+    end = start + 182 * 86400
+
+    def run():
+        return asyncio.run(backfill(ib, None, store, '1 min', start, end,
+                                    pacer=Pacer(**limits), verbose=False))
+
+    elapsed = timed(run)
+    bars = len(store.read()['ts'])
+    return elapsed, 182, (f"{bars} bars, peak {ib.peak_in_flight} in flight, "
+                          f"{ib.violations} pacing violations")
+
+
+# ============================================
+# BACKTEST
+# ============================================
+@benchmark('backtest_10y', 'backtest', 'run')
+def bench_backtest():
+    from quant_sentiment_backtest import run_backtest
+    prices, sentiment = fixtures.daily_frames(2520)
+    return timed(run_backtest, prices, sentiment), 1
+
+
+# ============================================
+# STARTUP
+# ============================================
+def _python_startup(code):
+    """Wall time of a fresh interpreter running `code` from the project root"""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], cwd=_SCRATCH, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start, 1
+
+
+for _name, _code in (('startup_scraper', 'import scraper'),
+                     ('startup_api', 'import api'),
+                     ('startup_bot', 'import automated_trading_bot'),
+                     ('startup_bot_ready', 'import automated_trading_bot as b; b.SentimentAnalyzer().analyze("warm")')):
+    benchmark(_name, 'startup', 'process')(lambda code=_code: _python_startup(code))
+
+
+@benchmark('vader_load', 'startup', 'process')
+def bench_vader_load():
+    return _python_startup('import sentiment_common; sentiment_common.get_analyzer()')
+
+
+# ============================================
+# CHECKS
+# ============================================
+_NEWSAPI_QUERIES = ['XOM', 'Exxon Mobil']
+_NEWSAPI_TOTAL = 300        # articles per query: 3 pages of 100
+
+
+def _newsapi_run(db_path, **server):
+    """backfill() both queries against a fresh NewsAPIServer; (new rows, requests, rows in db)"""
+    import sqlite3
+    import backfill_news
+    with fixtures.NewsAPIServer(total=_NEWSAPI_TOTAL, **server) as api, \
+            contextlib.redirect_stdout(io.StringIO()):
+        results = backfill_news.backfill(_NEWSAPI_QUERIES, max_pages=3, db_path=db_path, url=api.url)
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+    conn.close()
+    return sum(results.values()), api.requests, rows
+
+
+@check('newsapi_rate_limited', 'ingest')
+def check_newsapi_rate_limited():
+    """429s with an HTTP-date Retry-After are waited out and the pages retried"""
+    expected = _NEWSAPI_TOTAL * len(_NEWSAPI_QUERIES)
+    new, requests, rows = _newsapi_run(os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'news.db'),
+                                       throttle=2)
+    expect(new == expected and rows == expected, f"stored {new} new / {rows} rows, expected {expected}")
+    expect(requests == 2 + 3 * len(_NEWSAPI_QUERIES),
+           f"{requests} requests, expected 2 throttled + 3 pages per query")
+    return f"{rows} rows, {requests} requests"
+
+
+@check('newsapi_resume', 'ingest')
+def check_newsapi_resume():
+    """A second run asks only for what is newer than the stored point and stores nothing"""
+    db_path = os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'news.db')
+    _, _, rows = _newsapi_run(db_path)
+    new, requests, rows_after = _newsapi_run(db_path)
+    expect(new == 0 and rows_after == rows, f"second run stored {new} new rows ({rows} -> {rows_after})")
+    expect(requests == len(_NEWSAPI_QUERIES), f"second run made {requests} requests, expected one per query")
+    return f"second run: {requests} requests, 0 new"
+
+
+@check('newsapi_dedup', 'ingest')
+def check_newsapi_dedup():
+    """Refetching everything (resume point lost) adds no duplicate rows"""
+    import sqlite3
+    db_path = os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'news.db')
+    _, _, rows = _newsapi_run(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute('DELETE FROM backfill_state')
+    conn.commit()
+    conn.close()
+    new, requests, rows_after = _newsapi_run(db_path)
+    expect(requests == 3 * len(_NEWSAPI_QUERIES), f"{requests} requests, expected a full refetch")
+    expect(new == 0 and rows_after == rows, f"refetch stored {new} new rows ({rows} -> {rows_after})")
+    return f"{rows} rows after refetch"
+
+
+_IB_START = 1704067200      # 2024-01-01
+_IB_END = _IB_START + 20 * 86400     # 20 one-day windows of 1 min bars
+
+
+def _ib_run(store, pacer, **limits):
+    from ib_backfill import backfill
+    ib = fixtures.SimulatedIB(latency=0.01, **limits)
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = asyncio.run(backfill(ib, None, store, '1 min', _IB_START, _IB_END, pacer=pacer,
+                                       backoff=0.5, repeat_wait=0.2, timeout=5, verbose=False))
+    return ib, summary
+
+
+@check('ib_pacing_recovery', 'bars')
+def check_ib_pacing_recovery():
+    """IB's limits tighter than the pacer's: violations slow the pacer and every window is stored"""
+    from ib_backfill import Pacer
+    from bar_store import BarStore
+    store = BarStore(os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'XOM', '1min'))
+    ib, summary = _ib_run(store, Pacer(limit=20, window=2.0, burst=6, burst_window=0.5),
+                          limit=10, window=2.0, burst=3, burst_window=0.5)
+    expect(ib.violations > 0, "the simulator reported no pacing violations; scenario not exercised")
+    expect(summary['violations'] == ib.violations,
+           f"backfill saw {summary['violations']} of {ib.violations} violations")
+    expect(not summary['failed'], f"{len(summary['failed'])} of {summary['windows']} windows failed")
+    expect(BarStore.covers(store.completed(), _IB_START, _IB_END),
+           f"stored ranges {store.completed()} do not cover the backfill")
+    return f"{ib.violations} violations, {summary['retries']} retries, {summary['bars']} bars"
+
+
+@check('ib_skip_stored', 'bars')
+def check_ib_skip_stored():
+    """A second run over a stored range asks IB for nothing"""
+    from ib_backfill import Pacer
+    from bar_store import BarStore
+    store = BarStore(os.path.join(tempfile.mkdtemp(dir=_SCRATCH), 'XOM', '1min'))
+    limits = dict(limit=1000, window=2.0, burst=1000, burst_window=0.5)
+    _, first = _ib_run(store, Pacer(**limits), **limits)
+    expect(not first['failed'] and first['windows'] == 20, f"first run: {first}")
+    ib, summary = _ib_run(store, Pacer(**limits), **limits)
+    expect(summary['windows'] == 0 and summary['skipped'] == 20,
+           f"second run fetched {summary['windows']} windows, skipped {summary['skipped']} of 20")
+    expect(not ib.requests, f"second run sent {len(ib.requests)} requests")
+    return "20 of 20 windows skipped"
+
+
+# ============================================
+# RUNNER
+# ============================================
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds:9.2f} s "
+
+
+def run(selected, repeat):
+    results = {}
+    # Benchmarks must not pay for (or fill) trading_bot.log
+    logging.disable(logging.CRITICAL)
+    for bench in selected:
+        print(f"  {bench['name']:<22}", end='', flush=True)
+        try:
+            seconds, note = best_of(bench['fn'], repeat)
+        except (ImportError, subprocess.CalledProcessError) as e:
+            print(f"skipped ({e})")
+            continue
+        results[bench['name']] = {'seconds': seconds, 'unit': bench['unit']}
+        print(f"{format_seconds(seconds)} / {bench['unit']}" + (f"  ({note})" if note else ''))
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def run_checks(selected):
+    """Run each check once; returns the names that failed"""
+    failed = []
+    logging.disable(logging.CRITICAL)
+    for item in selected:
+        print(f"  {item['name']:<22}", end='', flush=True)
+        try:
+            note = item['fn']()
+        except ImportError as e:
+            print(f"skipped ({e})")
+            continue
+        except CheckFailed as e:
+            print(f"✗ {e}")
+            failed.append(item['name'])
+            continue
+        print("✓" + (f"  ({note})" if note else ''))
+    logging.disable(logging.NOTSET)
+    return failed
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; returns the names that regressed"""
+    regressions = []
+    print(f"\n{'benchmark':<22}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<22}{'-':>14}{format_seconds(result['seconds']):>14}{'new':>10}")
+            continue
+        change = result['seconds'] / base['seconds'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  ✗ REGRESSION'
+            regressions.append(name)
+        print(f"{name:<22}{format_seconds(base['seconds']):>14}"
+              f"{format_seconds(result['seconds']):>14}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the ExonQuantBot benchmark suite')
+    parser.add_argument('--only', nargs='*', help='benchmark names or groups to run')
+    parser.add_argument('--quick', action='store_true', help='skip the 1M-row database')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown before flagging (0.2 = 20%%)')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true',
+                        help='run the behaviour checks against the local NewsAPI/IB stand-ins instead')
+    args = parser.parse_args()
+
+    if args.check:
+        selected = [c for c in CHECKS
+                    if not args.only or c['name'] in args.only or c['group'] in args.only]
+        print(f"Running {len(selected)} checks...\n")
+        failed = run_checks(selected)
+        if failed:
+            print(f"\n✗ {len(failed)} check(s) failed: {', '.join(failed)}")
+            return 1
+        print(f"\n✓ All {len(selected)} checks passed")
+        return 0
+
+    selected = [b for b in BENCHMARKS
+                if not args.only or b['name'] in args.only or b['group'] in args.only]
+    if args.quick:
+        selected = [b for b in selected if not b['name'].endswith('_1m')]
+
+    print(f"Running {len(selected)} benchmarks (best of {args.repeat})...\n")
+    results = run(selected, args.repeat)
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\n→ Saved {len(results)} results to {BASELINE_FILE}")
+        return 0
+
+    if not baseline:
+        print("\nNo baseline yet. Run with --save-baseline to record one.")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\n✓ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
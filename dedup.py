@@ -0,0 +1,106 @@
+"""Near-duplicate story detection for the ingest path (SimHash + LSH bands)
+
+Bloomberg, Reuters and CNBC often run the same story under different links,
+so url_hash alone stores and scores one event several times. Each article
+gets a 64-bit SimHash of its title and summary; two articles whose
+fingerprints differ in at most MAX_DISTANCE bits are treated as the same
+story and share a cluster_id (the id of the story's first article).
+
+Fingerprints are split into MAX_DISTANCE + 1 bands. Any two fingerprints
+within MAX_DISTANCE bits agree exactly on at least one band, so a lookup
+only compares against the recent articles sharing a band value instead of
+the whole window.
+"""
+import re
+import hashlib
+
+BITS = 64
+MAX_DISTANCE = 5          # differing bits still counted as the same story
+WINDOW = 48 * 3600        # seconds apart two articles may be and still match
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_SIGN = 1 << (BITS - 1)
+
+
+def simhash(text):
+    """64-bit SimHash of the words in text; None if it has none"""
+    hashes = [int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), 'big')
+              for word in _TOKEN.findall(text.lower())]
+    if not hashes:
+        return None
+    half = len(hashes) / 2
+    fingerprint = 0
+    for bit in range(BITS):
+        if sum((h >> bit) & 1 for h in hashes) > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def to_db(fingerprint):
+    """Unsigned fingerprint -> signed 64-bit value SQLite can store"""
+    return fingerprint - (1 << BITS) if fingerprint & _SIGN else fingerprint
+
+
+def from_db(value):
+    return value + (1 << BITS) if value < 0 else value
+
+
+class StoryIndex:
+    """Fingerprints of recent articles, bucketed by band
+
+    stories maps cluster_id -> {'score', 'label', 'sources'} for every story
+    in the index, so duplicates reuse the first article's sentiment.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE, window=WINDOW):
+        self.max_distance = max_distance
+        self.window = window
+        bands = max_distance + 1
+        bounds = [i * BITS // bands for i in range(bands + 1)]
+        self._bands = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]  # (shift, mask)
+        self._buckets = {}    # (band, value) -> [(fingerprint, published_ts, cluster_id)]
+        self.stories = {}
+
+    @classmethod
+    def load(cls, conn, since, until=None, **kwargs):
+        """Index the stored articles published in [since - window, until + window]"""
+        index = cls(**kwargs)
+        sql = '''SELECT id, cluster_id, simhash, published_ts, source, sentiment_score, sentiment_label
+                 FROM articles
+                 WHERE published_ts >= ? AND simhash IS NOT NULL'''
+        params = [since - index.window]
+        if until is not None:
+            sql += ' AND published_ts <= ?'
+            params.append(until + index.window)
+        for id_, cluster_id, fingerprint, published_ts, source, score, label in conn.execute(
+                sql + ' ORDER BY id', params):
+            index.add(from_db(fingerprint), published_ts, cluster_id or id_, source, score, label)
+        return index
+
+    def _keys(self, fingerprint):
+        return [(band, (fingerprint >> shift) & mask) for band, (shift, mask) in enumerate(self._bands)]
+
+    def match(self, fingerprint, published_ts):
+        """cluster_id of the nearest story within max_distance bits and the window, or None"""
+        best, best_distance = None, self.max_distance + 1
+        for key in self._keys(fingerprint):
+            for other, other_ts, cluster_id in self._buckets.get(key, ()):
+                if abs(other_ts - published_ts) > self.window:
+                    continue
+                distance = bin(fingerprint ^ other).count('1')
+                if distance < best_distance:
+                    best, best_distance = cluster_id, distance
+        return best
+
+    def add(self, fingerprint, published_ts, cluster_id, source, score, label):
+        """Add an article; returns 'story', 'confirmation' (a new source) or None (a repeat)"""
+        for key in self._keys(fingerprint):
+            self._buckets.setdefault(key, []).append((fingerprint, published_ts, cluster_id))
+        story = self.stories.get(cluster_id)
+        if story is None:
+            self.stories[cluster_id] = {'score': score, 'label': label, 'sources': {source}}
+            return 'story'
+        if source in story['sources']:
+            return None
+        story['sources'].add(source)
+        return 'confirmation'
@@ -0,0 +1,201 @@
+"""Intraday event study: how quickly does the price react to a headline?
+
+Every article in news.db and its archive partitions is aligned to the last
+minute bar at or before its publish time (a sorted as-of join via
+np.searchsorted) and forward returns are measured at several horizons.
+Returns are summarised by sentiment score bucket, source and importance
+(same keyword/length formula as the bot).
+
+Articles are streamed from SQLite in chunks and each chunk is reduced to
+per-bucket sums before the next is read, so memory stays bounded no matter
+how many article x horizon pairs there are.
+
+Usage:
+    python event_study.py --bars xom_1min.csv
+    python event_study.py --bars xom_1min.parquet --horizons 1 5 15 30 60 --out results.csv
+    python event_study.py --bars bars/XOM/1min      # bar store filled by ib_backfill.py
+
+The bars file needs a time column (timestamp/date/datetime/time, epoch
+seconds or anything pandas can parse; naive times are taken as UTC) and a
+close column. A bar store directory is memory-mapped as is.
+"""
+import os
+import sqlite3
+import argparse
+import numpy as np
+import pandas as pd
+from scraper import DB_PATH
+from retention import all_databases
+from bar_store import BarStore
+from sentiment_common import IMPORTANT_KEYWORDS
+
+HORIZONS = [1, 5, 15, 30, 60, 240]   # minutes
+MAX_STALENESS = 300                  # seconds a bar may lag the event/target time
+CHUNK_SIZE = 200_000                 # articles per chunk
+
+SCORE_BINS = [-1.0, -0.5, -0.05, 0.05, 0.5, 1.0]
+SCORE_LABELS = ['strong_negative', 'negative', 'neutral', 'positive', 'strong_positive']
+IMPORTANCE_BINS = [1.0, 1.5, 2.0, 3.0]
+IMPORTANCE_LABELS = ['low', 'medium', 'high']
+
+TIME_COLUMNS = ('timestamp', 'date', 'datetime', 'time')
+
+
+def to_epoch(values):
+    """Epoch seconds (int64) from numbers or parseable timestamps; NaT -> -1"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    parsed = pd.to_datetime(values, utc=True, errors='coerce', format='mixed')
+    seconds = (parsed - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+    return seconds.fillna(-1).to_numpy(dtype=np.int64)
+
+
+def load_bars(path):
+    """Return (bar_ts, bar_close) sorted by time, from CSV, Parquet or a bar store directory"""
+    if os.path.isdir(path):
+        bars = BarStore(path).read()
+        return bars['ts'], bars['close']
+    df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    df.columns = [c.lower() for c in df.columns]
+    time_col = next((c for c in TIME_COLUMNS if c in df.columns), None)
+    if time_col is None or 'close' not in df.columns:
+        raise ValueError(f"{path} needs a close column and one of {', '.join(TIME_COLUMNS)}")
+
+    bars = pd.DataFrame({'ts': to_epoch(df[time_col]), 'close': df['close'].astype(float)})
+    bars = bars[(bars['ts'] >= 0) & (bars['close'] > 0)]
+    bars = bars.drop_duplicates('ts', keep='last').sort_values('ts')
+    return bars['ts'].to_numpy(), bars['close'].to_numpy()
+
+
+def importance(text):
+    """Vectorized SentimentAnalyzer._calculate_importance over a Series of text"""
+    lower = text.str.lower()
+    matches = np.zeros(len(text))
+    for keyword in IMPORTANT_KEYWORDS:
+        matches += lower.str.contains(keyword, regex=False).to_numpy()
+    length = text.str.len().to_numpy()
+    score = 1.0 + 0.5 * matches + 0.3 * (length > 100) + 0.3 * (length > 200)
+    return np.minimum(score, 3.0)
+
+
+def article_chunks(db_path, chunksize=CHUNK_SIZE):
+    """Yield DataFrames of (ts, score, source, importance) from the articles table
+    of news.db and every archive partition"""
+    sql = 'SELECT title, summary, source, published_ts, sentiment_score FROM articles'
+    for path in all_databases(db_path):
+        conn = sqlite3.connect(path)
+        try:
+            for chunk in pd.read_sql_query(sql, conn, chunksize=chunksize):
+                text = chunk['title'].fillna('') + ' ' + chunk['summary'].fillna('')
+                yield pd.DataFrame({
+                    'ts': chunk['published_ts'].fillna(-1).to_numpy(dtype=np.int64),
+                    'score': chunk['sentiment_score'].fillna(0.0).to_numpy(),
+                    'source': chunk['source'].fillna('unknown').to_numpy(),
+                    'importance': importance(text),
+                })
+        finally:
+            conn.close()
+
+
+def forward_returns(bar_ts, bar_close, event_ts, horizons, max_staleness=MAX_STALENESS):
+    """(n_events, n_horizons) simple returns; NaN where bars are missing or stale
+
+    The entry price is the last bar at or before the event; the exit is the
+    last bar at or before event + horizon. Both must be within max_staleness
+    of the time they stand for, so overnight gaps do not count as reactions.
+    """
+    offsets = np.asarray(horizons, dtype=np.int64) * 60
+    i0 = np.searchsorted(bar_ts, event_ts, side='right') - 1
+    i0c = np.clip(i0, 0, None)
+    valid0 = (i0 >= 0) & (event_ts - bar_ts[i0c] <= max_staleness) & (event_ts >= 0)
+
+    target = event_ts[:, None] + offsets[None, :]
+    ih = np.searchsorted(bar_ts, target.ravel(), side='right').reshape(target.shape) - 1
+    ihc = np.clip(ih, 0, None)
+    valid = (valid0[:, None] & (ih > i0[:, None])
+             & (target - bar_ts[ihc] <= max_staleness) & (target <= bar_ts[-1]))
+
+    returns = bar_close[ihc] / bar_close[i0c][:, None] - 1.0
+    returns[~valid] = np.nan
+    return returns
+
+
+def summarize_chunk(events, returns, horizons):
+    """Per (dimension, bucket, horizon) sums for one chunk"""
+    n_events, n_h = returns.shape
+    score_sign = np.sign(events['score'].to_numpy())
+
+    dimensions = {
+        'all': np.full(n_events, 'all', dtype=object),
+        'score': pd.cut(events['score'], SCORE_BINS, labels=SCORE_LABELS,
+                        include_lowest=True).astype(str).to_numpy(),
+        'source': events['source'].to_numpy(dtype=object),
+        'importance': pd.cut(events['importance'], IMPORTANCE_BINS, labels=IMPORTANCE_LABELS,
+                             include_lowest=True).astype(str).to_numpy(),
+    }
+
+    flat = returns.ravel()
+    keep = ~np.isnan(flat)
+    base = pd.DataFrame({
+        'horizon': np.tile(np.asarray(horizons), n_events)[keep],
+        'n': 1,
+        'ret_sum': flat[keep],
+        'ret_sq': flat[keep] ** 2,
+        'hits': (np.sign(returns) == score_sign[:, None]).ravel()[keep].astype(int),
+    })
+
+    parts = []
+    for dimension, labels in dimensions.items():
+        frame = base.assign(dimension=dimension, bucket=np.repeat(labels, n_h)[keep])
+        parts.append(frame.groupby(['dimension', 'bucket', 'horizon'])[
+            ['n', 'ret_sum', 'ret_sq', 'hits']].sum())
+    return pd.concat(parts)
+
+
+def finalize(totals):
+    """Turn accumulated sums into mean/std/t-stat/hit-rate per bucket"""
+    out = totals.copy()
+    n = out['n']
+    mean = out['ret_sum'] / n
+    var = (out['ret_sq'] / n - mean ** 2).clip(lower=0) * n / (n - 1).where(n > 1)
+    std = np.sqrt(var)
+    out['mean_bps'] = mean * 1e4
+    out['std_bps'] = std * 1e4
+    out['t_stat'] = mean / (std / np.sqrt(n))
+    out['hit_rate'] = out['hits'] / n
+    return out.drop(columns=['ret_sum', 'ret_sq', 'hits']).reset_index()
+
+
+def run_event_study(bars_path, db_path=DB_PATH, horizons=HORIZONS, chunksize=CHUNK_SIZE):
+    """Run the study; returns one row per (dimension, bucket, horizon)"""
+    bar_ts, bar_close = load_bars(bars_path)
+    if len(bar_ts) == 0:
+        raise ValueError(f"No usable bars in {bars_path}")
+
+    totals = None
+    for events in article_chunks(db_path, chunksize):
+        returns = forward_returns(bar_ts, bar_close, events['ts'].to_numpy(), horizons)
+        summary = summarize_chunk(events, returns, horizons)
+        totals = summary if totals is None else totals.add(summary, fill_value=0)
+
+    if totals is None:
+        raise ValueError("No articles in the database")
+    return finalize(totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Intraday news event study')
+    parser.add_argument('--bars', required=True, help='minute bars (CSV, Parquet or a bar store directory)')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--horizons', type=int, nargs='+', default=HORIZONS,
+                        help='forward horizons in minutes')
+    parser.add_argument('--out', default='event_study_results.csv')
+    args = parser.parse_args()
+
+    results = run_event_study(args.bars, args.db, args.horizons)
+    results.to_csv(args.out, index=False)
+
+    by_score = results[results['dimension'].isin(['all', 'score'])]
+    print("\nMean forward return (bps) by sentiment bucket and horizon (minutes):\n")
+    print(by_score.pivot(index='bucket', columns='horizon', values='mean_bps').round(2))
+    print(f"\nResults for all buckets saved in {args.out}")
@@ -0,0 +1,140 @@
+"""Feed registry: the RSS feeds scheduler.py polls and each feed's polling state
+
+Feeds live in the `feeds` table of news.db, which starts out with the
+feeds in scraper.FEEDS. Manage them from the command line:
+
+    python feeds.py list
+    python feeds.py add marketwatch https://feeds.marketwatch.com/marketwatch/topstories/
+    python feeds.py add wsj-markets https://feeds.a.dj.com/rss/RSSMarketsMain.xml --min 120 --max 1800
+    python feeds.py disable bloomberg
+    python feeds.py enable bloomberg
+
+A running scheduler picks up changes within a few minutes; `python scraper.py`
+and the API's /scrape/now fetch the enabled feeds too.
+"""
+import time
+import sqlite3
+import argparse
+from scraper import DB_PATH, FEEDS, init_db
+
+# Default bounds for a feed's polling interval, in seconds
+MIN_INTERVAL = 60
+MAX_INTERVAL = 3600
+START_INTERVAL = 300      # until the feed's publish rate has been observed
+
+# Columns a feed dict carries (besides name)
+STATE_COLUMNS = ('url', 'enabled', 'min_interval', 'max_interval', 'interval', 'next_poll',
+                 'rate', 'errors', 'last_polled', 'last_error', 'etag', 'modified')
+
+
+def init_feeds(conn):
+    """Create the registry, seeded with scraper.FEEDS when it is empty"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS feeds
+                    (name TEXT PRIMARY KEY,
+                     url TEXT NOT NULL,
+                     enabled INTEGER DEFAULT 1,
+                     min_interval REAL,
+                     max_interval REAL,
+                     interval REAL,
+                     next_poll REAL DEFAULT 0,
+                     rate REAL,
+                     errors INTEGER DEFAULT 0,
+                     last_polled REAL,
+                     last_error TEXT,
+                     etag TEXT,
+                     modified TEXT)''')
+    if conn.execute('SELECT 1 FROM feeds LIMIT 1').fetchone():
+        return
+    conn.executemany('''INSERT INTO feeds (name, url, min_interval, max_interval, interval)
+                        VALUES (?, ?, ?, ?, ?)''',
+                     [(name, url, MIN_INTERVAL, MAX_INTERVAL, START_INTERVAL)
+                      for name, url in FEEDS.items()])
+
+
+def load_feeds(conn, include_disabled=False):
+    """Registry rows as dicts, soonest due first"""
+    sql = f"SELECT name, {', '.join(STATE_COLUMNS)} FROM feeds"
+    if not include_disabled:
+        sql += ' WHERE enabled = 1'
+    rows = conn.execute(sql + ' ORDER BY next_poll, name').fetchall()
+    return [dict(zip(('name',) + STATE_COLUMNS, row)) for row in rows]
+
+
+def save_state(conn, feed):
+    """Persist a feed's polling state (the caller commits)"""
+    conn.execute('''UPDATE feeds SET interval = ?, next_poll = ?, rate = ?, errors = ?,
+                                     last_polled = ?, last_error = ?, etag = ?, modified = ?
+                    WHERE name = ?''',
+                 (feed['interval'], feed['next_poll'], feed['rate'], feed['errors'],
+                  feed['last_polled'], feed['last_error'], feed['etag'], feed['modified'],
+                  feed['name']))
+
+
+def add_feed(conn, name, url, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL):
+    """Register a feed (or update its URL/bounds)
+
+    The feed is due at once and its ETag/Last-Modified are cleared, so a
+    running scheduler polls it in full at its next registry refresh.
+    """
+    if min_interval <= 0 or max_interval < min_interval:
+        raise ValueError("Need 0 < min_interval <= max_interval")
+    conn.execute('''INSERT INTO feeds (name, url, min_interval, max_interval, interval, next_poll)
+                    VALUES (?, ?, ?, ?, ?, 0)
+                    ON CONFLICT(name) DO UPDATE SET
+                        url = excluded.url,
+                        enabled = 1,
+                        min_interval = excluded.min_interval,
+                        max_interval = excluded.max_interval,
+                        next_poll = 0,
+                        etag = NULL,
+                        modified = NULL''',
+                 (name, url, min_interval, max_interval,
+                  min(max(START_INTERVAL, min_interval), max_interval)))
+
+
+def set_enabled(conn, name, enabled):
+    """Enable or disable a feed; returns False if there is no such feed"""
+    cur = conn.execute('UPDATE feeds SET enabled = ? WHERE name = ?', (int(enabled), name))
+    return cur.rowcount > 0
+
+
+def _ago(ts, now):
+    return '-' if not ts else f"{now - ts:.0f}s ago"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Manage the RSS feed registry')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='show every feed and its polling state')
+    add = sub.add_parser('add', help='add or update a feed')
+    add.add_argument('name')
+    add.add_argument('url')
+    add.add_argument('--min', type=float, default=MIN_INTERVAL, help='shortest interval (seconds)')
+    add.add_argument('--max', type=float, default=MAX_INTERVAL, help='longest interval (seconds)')
+    for command in ('enable', 'disable'):
+        sub.add_parser(command).add_argument('name')
+    args = parser.parse_args()
+
+    init_db()
+    conn = sqlite3.connect(DB_PATH)
+    init_feeds(conn)
+
+    if args.command == 'list':
+        now = time.time()
+        print(f"{'feed':<20}{'on':>3}{'interval':>10}{'per hour':>10}{'errors':>8}  last poll")
+        for feed in load_feeds(conn, include_disabled=True):
+            per_hour = f"{feed['rate'] * 3600:.1f}" if feed['rate'] is not None else '-'
+            print(f"{feed['name']:<20}{'y' if feed['enabled'] else 'n':>3}"
+                  f"{feed['interval'] or 0:>9.0f}s{per_hour:>10}{feed['errors']:>8}  "
+                  f"{_ago(feed['last_polled'], now)}"
+                  + (f"  ({feed['last_error']})" if feed['last_error'] else ''))
+    elif args.command == 'add':
+        add_feed(conn, args.name, args.url, args.min, args.max)
+        print(f"✓ Added {args.name}")
+    elif not set_enabled(conn, args.name, args.command == 'enable'):
+        print(f"✗ No feed named {args.name}")
+    else:
+        print(f"✓ {args.name} {args.command}d")
+
+    conn.commit()
+    conn.close()
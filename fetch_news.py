@@ -1,6 +1,12 @@
+import os
+import sys
 import requests
 
-api_key = "8d26285826f94d0e91fa073178e10600"  # <-- Your real NewsAPI key
+# For history in news.db use backfill_news.py; this writes exxon_news.txt for analyze_news.py
+api_key = os.environ.get('NEWS_API_KEY', '')
+if not api_key:
+    print("Set NEWS_API_KEY in the environment first.")
+    sys.exit(1)
 topic = "Exxon Mobil"
 page_size = 100  # Max per NewsAPI request (free tier)
 max_pages = 5    # Up to 5 pages = 500 articles
@@ -0,0 +1,272 @@
+"""Historical bar backfill from Interactive Brokers into the local bar store
+
+Long ranges are split into windows of the longest duration IB serves for
+the bar size (1 day of 1 min bars, 52 weeks of daily bars, ...), aligned to
+a fixed grid so re-runs and overlapping ranges ask for the same windows.
+Windows already in the store (see bar_store.py) are skipped, so an
+interrupted backfill resumes where it stopped.
+
+Requests go out through reqHistoricalDataAsync with as many in flight as
+IB allows, paced to IB's historical data limits: at most 60 requests per
+10 minutes, no more than 5 for the contract within 2 seconds, and a wait
+before repeating a request. A pacing violation reported by IB pauses new
+requests, halves the request rate and the affected windows are retried.
+
+Usage (TWS or IB Gateway running, see Config in automated_trading_bot.py):
+    python ib_backfill.py XOM --bar-size "1 day" --start 2005-01-01
+    python ib_backfill.py XOM --bar-size "1 min" --start 2024-01-01 --end 2024-07-01
+    python ib_backfill.py XOM --bar-size "1 min" --status
+
+backfill() takes any object with IB's reqHistoricalDataAsync and
+errorEvent, which is how benchmarks/fixtures.py drives it against a
+simulated endpoint.
+"""
+import time
+import math
+import asyncio
+import argparse
+import calendar
+from collections import deque
+from datetime import datetime, date, timezone
+from bar_store import BarStore, COLUMNS, store_path
+
+# Bar size -> (window seconds, durationStr): the longest request IB serves for that size
+BAR_SIZES = {
+    '1 secs': (1800, '1800 S'),
+    '5 secs': (3600, '3600 S'),
+    '10 secs': (14400, '14400 S'),
+    '15 secs': (14400, '14400 S'),
+    '30 secs': (28800, '28800 S'),
+    '1 min': (86400, '1 D'),
+    '2 mins': (2 * 86400, '2 D'),
+    '3 mins': (7 * 86400, '1 W'),
+    '5 mins': (7 * 86400, '1 W'),
+    '10 mins': (7 * 86400, '1 W'),
+    '15 mins': (7 * 86400, '1 W'),
+    '20 mins': (7 * 86400, '1 W'),
+    '30 mins': (28 * 86400, '4 W'),
+    '1 hour': (28 * 86400, '4 W'),
+    '2 hours': (28 * 86400, '4 W'),
+    '4 hours': (28 * 86400, '4 W'),
+    '1 day': (364 * 86400, '52 W'),
+}
+
+MAX_IN_FLIGHT = 50         # IB's limit on simultaneous historical data requests
+PACING_LIMIT = 60          # requests ...
+PACING_WINDOW = 600        # ... per 10 minutes
+BURST_LIMIT = 5            # requests for one contract ...
+BURST_WINDOW = 2.0         # ... within 2 seconds (IB flags the 6th)
+REPEAT_WAIT = 15           # seconds before asking for the same window again
+PACING_BACKOFF = 60        # pause after IB reports a pacing violation
+PACING_SLOWDOWN = 2.0      # ... and cut the request rate by this factor
+REQUEST_TIMEOUT = 120      # seconds before a request counts as failed
+MAX_RETRIES = 5
+COMPACT_EVERY = 200        # windows between compactions of the store
+
+_PACING_ERRORS = (162, 322)     # 162 is also "no data", told apart by its message
+
+
+def windows(start, end, size):
+    """[start, end) windows of `size` seconds on a grid aligned to the epoch, covering [start, end)"""
+    first = start - start % size
+    return [(lo, lo + size) for lo in range(first, end, size)]
+
+
+def bar_epoch(value):
+    """Epoch seconds of a bar's date (datetime with formatDate=2, date for daily bars)"""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    if isinstance(value, date):
+        return calendar.timegm(value.timetuple())
+    return int(value)
+
+
+def to_columns(bars, start, end):
+    """Bars within [start, end) as store columns"""
+    rows = [(bar_epoch(b.date), b.open, b.high, b.low, b.close, b.volume) for b in bars]
+    rows = [row for row in rows if start <= row[0] < end]
+    return {c: [row[i] for row in rows] for i, c in enumerate(COLUMNS)}
+
+
+class Pacer:
+    """IB's historical data pacing rules as sliding windows over request start times"""
+
+    def __init__(self, limit=PACING_LIMIT, window=PACING_WINDOW, burst=BURST_LIMIT,
+                 burst_window=BURST_WINDOW, max_in_flight=MAX_IN_FLIGHT):
+        self.limit = limit
+        self.window = window
+        self.burst = burst
+        self.burst_window = burst_window
+        self.max_in_flight = max_in_flight
+        self.started = deque()      # start times within the last window
+        self.paused_until = 0.0
+
+    def delay(self, now, in_flight):
+        """Seconds until another request may start; inf while max_in_flight are out"""
+        while self.started and self.started[0] <= now - self.window:
+            self.started.popleft()
+        if in_flight >= self.max_in_flight:
+            return math.inf
+        wait = self.paused_until - now
+        if len(self.started) >= self.limit:
+            wait = max(wait, self.started[-self.limit] + self.window - now)
+        if len(self.started) >= self.burst:
+            wait = max(wait, self.started[-self.burst] + self.burst_window - now)
+        return max(wait, 0.0)
+
+    def record(self, now):
+        self.started.append(now)
+
+    def pause(self, now, seconds):
+        self.paused_until = max(self.paused_until, now + seconds)
+
+    def slow_down(self, now, seconds, factor=PACING_SLOWDOWN):
+        """Pause, and unless already paused cut the request rate by factor
+
+        IB's limits can be tighter than the configured ones (other clients
+        share them), so a violation means this pacer is too loose. Requests
+        failing together in one burst slow it down only once.
+        """
+        if now >= self.paused_until:
+            self.limit, self.window = self._slower(self.limit, self.window, factor)
+            self.burst, self.burst_window = self._slower(self.burst, self.burst_window, factor)
+        self.pause(now, seconds)
+
+    @staticmethod
+    def _slower(count, span, factor):
+        """count per span at about 1/factor the rate: fewer per span (smaller bursts) down to one, then longer spans"""
+        if count > 1:
+            return max(1, int(count / factor)), span
+        return count, span * factor
+
+
+async def backfill(ib, contract, store, bar_size, start, end, what_to_show='TRADES',
+                   use_rth=False, pacer=None, backoff=PACING_BACKOFF, repeat_wait=REPEAT_WAIT,
+                   timeout=REQUEST_TIMEOUT, verbose=True):
+    """Fetch every window of [start, end) missing from store; returns a summary dict"""
+    size, duration = BAR_SIZES[bar_size]
+    pacer = pacer or Pacer()
+    done = store.completed()
+    todo = [w for w in windows(start, end, size) if not BarStore.covers(done, *w)]
+    pending = deque((0.0, w, 0) for w in todo)    # (not before, window, attempts), oldest first
+    summary = {'windows': len(todo), 'skipped': len(windows(start, end, size)) - len(todo),
+               'bars': 0, 'retries': 0, 'violations': 0, 'failed': []}
+    errors = {}                 # reqId -> (code, message)
+    in_flight = {}              # task -> (window, attempts, started)
+    since_compact = 0
+
+    def on_error(req_id, code, message, *args):
+        errors[req_id] = (code, message)
+        if code in _PACING_ERRORS and (code == 322 or 'pacing' in message.lower()):
+            summary['violations'] += 1
+            pacer.slow_down(time.monotonic(), backoff)
+
+    ib.errorEvent += on_error
+    try:
+        while pending or in_flight:
+            now = time.monotonic()
+            while pending and pending[0][0] <= now and pacer.delay(now, len(in_flight)) == 0:
+                _, (lo, hi), attempts = pending.popleft()
+                pacer.record(now)
+                task = asyncio.ensure_future(ib.reqHistoricalDataAsync(
+                    contract, endDateTime=datetime.fromtimestamp(hi, timezone.utc),
+                    durationStr=duration, barSizeSetting=bar_size, whatToShow=what_to_show,
+                    useRTH=use_rth, formatDate=2, timeout=timeout))
+                in_flight[task] = ((lo, hi), attempts, now)
+
+            # Wake when the next request may start or one finishes
+            wait = math.inf
+            if pending:
+                wait = max(pacer.delay(now, len(in_flight)), pending[0][0] - now)
+            if in_flight:
+                finished, _ = await asyncio.wait(list(in_flight), timeout=None if math.isinf(wait) else wait,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(wait)
+                finished = ()
+
+            for task in finished:
+                (lo, hi), attempts, started = in_flight.pop(task)
+                try:
+                    bars = task.result()
+                    code, message = errors.pop(getattr(bars, 'reqId', None), (None, ''))
+                    if code is not None and not (code == 162 and 'no data' in message.lower()):
+                        raise RuntimeError(f"IB error {code}: {message}")
+                    if not bars and code is None and time.monotonic() - started >= timeout:
+                        raise TimeoutError(f"no answer in {timeout}s")
+                except Exception as e:
+                    if attempts + 1 >= MAX_RETRIES:
+                        summary['failed'].append((lo, hi))
+                        print(f"✗ {bar_size} window {_day(lo)}..{_day(hi)} failed: {e}")
+                    else:
+                        summary['retries'] += 1
+                        pending.append((time.monotonic() + repeat_wait, (lo, hi), attempts + 1))
+                    continue
+
+                columns = to_columns(bars, lo, hi)
+                store.write_segment(lo, hi, columns, complete=hi <= time.time())
+                summary['bars'] += len(columns['ts'])
+                since_compact += 1
+                if since_compact >= COMPACT_EVERY:
+                    store.compact()
+                    since_compact = 0
+                    if verbose:
+                        remaining = len(pending) + len(in_flight)
+                        print(f"→ {len(todo) - remaining}/{len(todo)} windows, {summary['bars']} bars")
+    finally:
+        ib.errorEvent -= on_error
+        for task in in_flight:
+            task.cancel()
+        store.compact()
+    return summary
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def _epoch(text):
+    return calendar.timegm(datetime.strptime(text, '%Y-%m-%d').timetuple())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Backfill historical bars from IB into the bar store')
+    parser.add_argument('symbol')
+    parser.add_argument('--bar-size', default='1 min', choices=list(BAR_SIZES))
+    parser.add_argument('--start', help='first day, YYYY-MM-DD')
+    parser.add_argument('--end', help='last day (exclusive), YYYY-MM-DD; default now')
+    parser.add_argument('--what', default='TRADES', help='whatToShow (TRADES, MIDPOINT, ...)')
+    parser.add_argument('--rth', action='store_true', help='regular trading hours only')
+    parser.add_argument('--status', action='store_true', help='show what is stored')
+    args = parser.parse_args()
+
+    path = store_path(args.symbol, args.bar_size)
+    store = BarStore(path)
+    if args.status or not args.start:
+        m = store.manifest
+        print(f"{path}: {m['rows']} bars" + (f", {_day(m['first_ts'])} to {_day(m['last_ts'])}" if m['rows'] else ''))
+        for lo, hi in store.completed():
+            print(f"  fetched {_day(lo)} .. {_day(hi)}")
+        raise SystemExit
+
+    from ib_insync import IB, Stock
+    from automated_trading_bot import Config
+
+    ib = IB()
+    ib.connect(Config.IB_HOST, Config.IB_PORT, clientId=Config.IB_CLIENT_ID + 10)
+    try:
+        contract = Stock(args.symbol, Config.EXCHANGE, Config.CURRENCY)
+        ib.qualifyContracts(contract)
+        end = _epoch(args.end) if args.end else int(time.time())
+        summary = ib.run(backfill(ib, contract, store, args.bar_size, _epoch(args.start), end,
+                                  args.what, args.rth))
+    finally:
+        ib.disconnect()
+
+    print(f"✓ {args.symbol} {args.bar_size}: {summary['bars']} bars in {summary['windows']} windows "
+          f"({summary['skipped']} already stored, {summary['retries']} retries, "
+          f"{summary['violations']} pacing violations) -> {path}")
+    if summary['failed']:
+        print(f"✗ {len(summary['failed'])} windows failed; run again to retry them")
@@ -0,0 +1,312 @@
+"""On-demand profiling for the running bot and API (no restart needed)
+
+Three tools, all standard library and idle until asked for:
+
+- Sampler: a statistical CPU profile. A background thread records every
+  other thread's stack each SAMPLE_INTERVAL seconds; where the OS exposes
+  per-thread CPU clocks (Linux, macOS) each sample is weighted by the CPU
+  time the thread used since the last one, so threads blocked on I/O or
+  sleeping do not show up. Elsewhere samples are counted as wall time.
+- MemoryTracker: tracemalloc snapshots. The first snapshot starts tracing,
+  each later one reports what grew since the previous one; stop() ends
+  tracing and its overhead.
+- SlowWatch: wraps each bot cycle or API request. When one runs longer
+  than its threshold, it samples the process until that cycle or request
+  finishes and saves the profile. Below the threshold nothing is sampled.
+
+Reports are written to PROFILE_DIR as <label>-<time>.txt, with the raw
+stacks in .collapsed files that flamegraph.pl or speedscope can open.
+
+Triggers: automated_trading_bot.py profiles on SIGUSR1, snapshots memory on
+SIGUSR2 and stops memory tracing on SIGURG (see install_signal_handlers);
+api.py has the same under /debug/ behind DEBUG_TOKEN.
+"""
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+import itertools
+import contextlib
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_SECONDS = 30         # default length of a signal-triggered CPU profile
+SAMPLE_INTERVAL = 0.005      # seconds between stack samples
+SLOW_CAPTURE_MAX = 120       # longest a slow-cycle capture keeps sampling
+MEMORY_FRAMES = 10           # traceback depth tracemalloc records
+TOP = 25                     # rows in each report table
+
+logger = logging.getLogger('QuantBot.profiling')
+
+_CPU_CLOCKS = hasattr(time, 'pthread_getcpuclockid')
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Sampler:
+    """Stacks of every thread but the sampler's own, weighted by CPU time when available
+
+    stacks maps 'thread;outer;...;inner' -> seconds of CPU (or samples).
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.cpu = _CPU_CLOCKS and self._thread_cpu(threading.get_ident()) is not None
+        self.stacks = Counter()
+        self.samples = 0
+        self.elapsed = 0.0
+        self._last_cpu = {}     # thread ident -> CPU clock at the previous sample
+
+    def _thread_cpu(self, ident):
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(ident))
+        except (OSError, OverflowError):
+            return None         # thread exited between listing and reading
+
+    def sample(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            weight = 1
+            if self.cpu:
+                now = self._thread_cpu(ident)
+                previous = self._last_cpu.get(ident)
+                self._last_cpu[ident] = now
+                if now is None or previous is None or now <= previous:
+                    continue
+                weight = now - previous
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[';'.join(reversed(stack))] += weight
+        self.samples += 1
+
+    def run(self, seconds=None, until=None):
+        """Sample for `seconds`, or until until() is true (at most SLOW_CAPTURE_MAX seconds)"""
+        start = time.monotonic()
+        deadline = start + (seconds if seconds is not None else SLOW_CAPTURE_MAX)
+        while time.monotonic() < deadline and not (until and until()):
+            self.sample()
+            time.sleep(self.interval)
+        self.elapsed += time.monotonic() - start
+        return self
+
+    def report(self, title, top=TOP):
+        """Top functions by self and total time, as text"""
+        unit = 'CPU s' if self.cpu else 'samples'
+        total = sum(self.stacks.values())
+        own, inclusive = Counter(), Counter()
+        for stack, weight in self.stacks.items():
+            frames = stack.split(';')[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += weight
+            for frame in set(frames):
+                inclusive[frame] += weight
+
+        lines = [f"{title}: {self.elapsed:.1f}s, {self.samples} samples, "
+                 f"{total:.3f} {unit} in {len({s.split(';')[0] for s in self.stacks})} threads"]
+        if not total:
+            lines.append("  (nothing ran)")
+            return '\n'.join(lines) + '\n'
+        lines.append(f"  {'self%':>6}  {'total%':>6}  function")
+        for frame, weight in own.most_common(top):
+            lines.append(f"  {100 * weight / total:>6.1f}  {100 * inclusive[frame] / total:>6.1f}  {frame}")
+        return '\n'.join(lines) + '\n'
+
+    def collapsed(self):
+        """Stacks in flamegraph's collapsed format (integer weights: microseconds or samples)"""
+        scale = 1e6 if self.cpu else 1
+        return ''.join(f"{stack} {round(weight * scale)}\n" for stack, weight in self.stacks.items()
+                       if round(weight * scale))
+
+    def save(self, label, title=None, directory=None):
+        """Write the report and the collapsed stacks; returns the report's path"""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{label}-{datetime.now():%Y%m%d-%H%M%S}")
+        with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write(self.report(title or label))
+        return base + '.txt'
+
+
+def profile_cpu(seconds, interval=SAMPLE_INTERVAL):
+    """Sample the other threads for `seconds` (blocks the caller)"""
+    return Sampler(interval).run(seconds)
+
+
+def profile_in_background(seconds, label, directory=None):
+    """Profile for `seconds` on a daemon thread and save the result under label"""
+    def run():
+        path = profile_cpu(seconds).save(label, f"CPU profile ({label})", directory)
+        logger.warning(f"CPU profile saved to {path}")
+    threading.Thread(target=run, name='profiler', daemon=True).start()
+
+
+class MemoryTracker:
+    """tracemalloc on demand: the first snapshot starts tracing, later ones diff against the previous"""
+
+    _FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'))
+
+    def __init__(self, frames=MEMORY_FRAMES):
+        self.frames = frames
+        self.previous = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, top=TOP):
+        """Take a snapshot; returns a text report of the growth since the previous one"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+                self.previous = None
+            snap = tracemalloc.take_snapshot().filter_traces(self._FILTERS)
+            previous, self.previous = self.previous, snap
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Traced memory: {current / 1e6:.1f} MB now, {peak / 1e6:.1f} MB peak"]
+        if previous is None:
+            lines.append("Tracing started; the next snapshot shows what grew since now.")
+            return '\n'.join(lines) + '\n'
+        lines.append("Largest growth since the previous snapshot:")
+        for stat in snap.compare_to(previous, 'lineno')[:top]:
+            frame = stat.traceback[0]
+            lines.append(f"  {stat.size_diff / 1024:>+10.1f} KiB {stat.count_diff:>+8} blocks  "
+                         f"{frame.filename}:{frame.lineno}")
+        return '\n'.join(lines) + '\n'
+
+    def save(self, label, directory=None):
+        """snapshot() written to a file; returns its path"""
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{label}-memory-{datetime.now():%Y%m%d-%H%M%S}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.snapshot())
+        return path
+
+    def stop(self):
+        """Stop tracing and drop the saved snapshot"""
+        with self._lock:
+            tracemalloc.stop()
+            self.previous = None
+
+
+class SlowWatch:
+    """Profiles the process while a watched activity overruns threshold seconds
+
+    begin()/end() (or the watch() context manager) cost a lock and a notify;
+    a watchdog thread sleeps until the oldest activity's deadline and only
+    then starts sampling, until that activity ends. threshold can be changed
+    at any time; 0 turns the watch off.
+    """
+
+    def __init__(self, threshold, label='slow', directory=None):
+        self.threshold = threshold
+        self.label = label
+        self.directory = directory
+        self.captured = 0
+        self._active = {}           # token -> (start, description)
+        self._profiled = set()      # tokens already captured
+        self._tokens = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def begin(self, description):
+        token = next(self._tokens)
+        with self._cond:
+            self._active[token] = (time.monotonic(), description)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-watch', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return token
+
+    def end(self, token):
+        with self._cond:
+            self._active.pop(token, None)
+            self._profiled.discard(token)
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def watch(self, description):
+        if not self.threshold:
+            yield
+            return
+        token = self.begin(description)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    def _overdue(self):
+        """The oldest unprofiled activity and its start once past the threshold (waits until then)"""
+        with self._cond:
+            while True:
+                pending = [(start, token, what) for token, (start, what) in self._active.items()
+                           if token not in self._profiled]
+                if not pending or not self.threshold:
+                    self._cond.wait()
+                    continue
+                start, token, what = min(pending)
+                remaining = start + self.threshold - time.monotonic()
+                if remaining <= 0:
+                    self._profiled.add(token)
+                    return token, start, what
+                self._cond.wait(remaining)
+
+    def _run(self):
+        while True:
+            token, start, what = self._overdue()
+            sampler = Sampler().run(until=lambda: token not in self._active)
+            took = time.monotonic() - start
+            path = sampler.save(self.label, f"{what} took {took:.1f}s "
+                                f"(threshold {self.threshold}s; sampled after the threshold)",
+                                self.directory)
+            self.captured += 1
+            logger.warning(f"Slow {what} ({took:.1f}s): profile saved to {path}")
+
+
+def install_signal_handlers(label, memory=None, seconds=None, directory=None):
+    """SIGUSR1: CPU profile for `seconds` (PROFILE_SECONDS env); SIGUSR2: memory snapshot/diff;
+    SIGURG: stop memory tracing
+
+    SIGURG is otherwise ignored by default, so sending it to a process without
+    these handlers does no harm. Call from the main thread. Returns False where
+    the signals do not exist (Windows).
+    """
+    if not hasattr(signal, 'SIGUSR1'):
+        return False
+    memory = memory or MemoryTracker()
+
+    def cpu(signum, frame):
+        length = seconds or float(os.environ.get('PROFILE_SECONDS', PROFILE_SECONDS))
+        logger.warning(f"Profiling CPU for {length:.0f}s...")
+        profile_in_background(length, label, directory)
+
+    def mem(signum, frame):
+        def run():
+            path = memory.save(label, directory)
+            logger.warning(f"Memory snapshot saved to {path}")
+        threading.Thread(target=run, name='memory-snapshot', daemon=True).start()
+
+    def mem_stop(signum, frame):
+        def run():
+            memory.stop()       # waits for a snapshot in progress
+            logger.warning("Memory tracing stopped")
+        threading.Thread(target=run, name='memory-stop', daemon=True).start()
+
+    signal.signal(signal.SIGUSR1, cpu)
+    signal.signal(signal.SIGUSR2, mem)
+    signal.signal(signal.SIGURG, mem_stop)
+    return True
@@ -1,53 +1,91 @@
+import sqlite3
+import calendar
 import pandas as pd
-import yfinance as yf
-from collections import defaultdict
-from datetime import datetime
+import bar_store
+from rollups import get_series
+from scraper import DB_PATH
+
+SYMBOL = 'XOM'
 
 # === 1. COLLECT DAILY SENTIMENT === #
-daily = defaultdict(lambda: {'positive':0, 'negative':0, 'neutral':0})
-with open('exxon_news_labeled.txt', 'r', encoding='utf-8') as f:
-    for line in f:
-        # Expects lines like: sentiment\tYYYY-MM-DDTHH:MM...\theadline
-        parts = line.strip().split('\t')
-        if len(parts) >= 3:
-            sentiment, published, headline = parts[0], parts[1], parts[2]
-            # Get YYYY-MM-DD from published
-            try:
-                day = published[:10]
-            except:
-                continue
-            daily[day][sentiment] += 1
+def load_daily_sentiment(symbol=SYMBOL, db_path=DB_PATH):
+    """Read the daily rollups maintained by the scraper instead of re-parsing headlines"""
+    conn = sqlite3.connect(db_path)
+    daily = get_series(conn, '1d', symbol=symbol)
+    conn.close()
 
-# Make into DataFrame
-sentiment_df = pd.DataFrame([
-    {'date': day, 
-     'pos': vals['positive'],
-     'neg': vals['negative'],
-     'neu': vals['neutral'],
-     'sentiment_score': vals['positive'] - vals['negative']}
-    for day, vals in daily.items()
-])
-sentiment_df['date'] = pd.to_datetime(sentiment_df['date'])
+    # Make into DataFrame
+    sentiment_df = pd.DataFrame([
+        {'date': point['bucket'],
+         'pos': point['positive'],
+         'neg': point['negative'],
+         'neu': point['neutral'],
+         'sentiment_score': point['positive'] - point['negative']}
+        for point in daily
+    ])
+    sentiment_df['date'] = pd.to_datetime(sentiment_df['date'], unit='s')
+    return sentiment_df
 
 # === 2. GET HISTORICAL PRICE DATA === #
-start = sentiment_df['date'].min().strftime('%Y-%m-%d')
-end = sentiment_df['date'].max().strftime('%Y-%m-%d')
-prices = yf.download('XOM', start=start, end=end)
-prices = pd.DataFrame(prices).copy()
-prices.reset_index(inplace=True)         # GUARANTEED to flatten index
-if 'Date' in prices.columns:
-    prices_use = prices[['Date', 'Close']].copy()
-    prices_use.columns = ['date', 'close']
-else:
-    # fallback for alternate yfinance output
-    prices_use = prices[['index', 'Close']].copy()
-    prices_use.columns = ['date', 'close']
-prices_use['date'] = pd.to_datetime(prices_use['date'])
+def load_stored_prices(symbol, start, end):
+    """Daily closes from the local bar store (python ib_backfill.py SYMBOL --bar-size "1 day"),
+    memory-mapped; None if it has no bars for the range"""
+    since, until = (calendar.timegm(pd.Timestamp(d).timetuple()) for d in (start, end))
+    bars = bar_store.load(symbol, '1 day', since=since, until=until)
+    if not len(bars['ts']):
+        return None
+    return pd.DataFrame({'date': pd.to_datetime(bars['ts'], unit='s'), 'close': bars['close']})
 
+def stored_gaps(symbol, start, end):
+    """Parts of [start, end) the bar store has not fetched, as (start, end) date strings"""
+    since, until = (calendar.timegm(pd.Timestamp(d).timetuple()) for d in (start, end))
+    gaps = []
+    for lo, hi in bar_store.BarStore(bar_store.store_path(symbol, '1 day')).completed():
+        if lo > since:
+            gaps.append((since, min(lo, until)))
+        since = max(since, hi)
+        if since >= until:
+            break
+    if since < until:
+        gaps.append((since, until))
+    day = lambda ts: pd.Timestamp(ts, unit='s').strftime('%Y-%m-%d')
+    # Whole days, widened outwards: a day the store does have is simply fetched twice
+    return [(day(lo), day(hi + 86399)) for lo, hi in gaps if lo < hi]
 
-# === 3. ALIGN AND BACKTEST === #
-combined = pd.merge(prices_use, sentiment_df, on='date', how='left').fillna(0)
+def download_prices(symbol, start, end):
+    """Daily closes from yfinance as a (date, close) DataFrame"""
+    import yfinance as yf
+    prices = yf.download(symbol, start=start, end=end)
+    prices = pd.DataFrame(prices).copy()
+    prices.reset_index(inplace=True)         # GUARANTEED to flatten index
+    if 'Date' in prices.columns:
+        prices_use = prices[['Date', 'Close']].copy()
+        prices_use.columns = ['date', 'close']
+    else:
+        # fallback for alternate yfinance output
+        prices_use = prices[['index', 'Close']].copy()
+        prices_use.columns = ['date', 'close']
+    prices_use['date'] = pd.to_datetime(prices_use['date'])
+    return prices_use
+
+def load_prices(symbol, start, end):
+    """Daily closes as a (date, close) DataFrame: from the bar store, with any
+    dates it has not fetched (or all of them, without a store) from yfinance"""
+    stored = load_stored_prices(symbol, start, end)
+    gaps = stored_gaps(symbol, start, end)
+    if not gaps:
+        return stored
+    if stored is not None:
+        print(f"→ {symbol}: filling {len(gaps)} gap(s) in the bar store from yfinance: "
+              + ', '.join(f"{lo}..{hi}" for lo, hi in gaps))
+    parts = ([stored] if stored is not None else []) + [download_prices(symbol, lo, hi) for lo, hi in gaps]
+    if len(parts) == 1:
+        return parts[0]
+    # Stored bars win where a widened gap overlaps them
+    prices = pd.concat(parts).drop_duplicates('date', keep='first')
+    return prices.sort_values('date').reset_index(drop=True)
 
+# === 3. ALIGN AND BACKTEST === #
 # Simple trading logic: signal = 1 if sentiment > 0, -1 if < 0, 0 if neutral
 def get_signal(row):
     if row['sentiment_score'] > 0:
@@ -56,16 +94,27 @@ def get_signal(row):
         return -1 # SELL
     else:
         return 0 # HOLD
-combined['signal'] = combined.apply(get_signal, axis=1)
 
-# Simulated returns: change only when signal changes
-combined['daily_return'] = combined['close'].pct_change()
-combined['strategy_return'] = combined['signal'].shift(1) * combined['daily_return']
-combined['cum_strategy'] = (1 + combined['strategy_return'].fillna(0)).cumprod()
-combined['cum_buyhold'] = (1 + combined['daily_return'].fillna(0)).cumprod()
+def run_backtest(prices_use, sentiment_df):
+    """Align daily sentiment with closes and compute strategy vs buy-and-hold"""
+    combined = pd.merge(prices_use, sentiment_df, on='date', how='left').fillna(0)
+    combined['signal'] = combined.apply(get_signal, axis=1)
+
+    # Simulated returns: change only when signal changes
+    combined['daily_return'] = combined['close'].pct_change()
+    combined['strategy_return'] = combined['signal'].shift(1) * combined['daily_return']
+    combined['cum_strategy'] = (1 + combined['strategy_return'].fillna(0)).cumprod()
+    combined['cum_buyhold'] = (1 + combined['daily_return'].fillna(0)).cumprod()
+    return combined
+
+if __name__ == "__main__":
+    sentiment_df = load_daily_sentiment()
+    start = sentiment_df['date'].min().strftime('%Y-%m-%d')
+    end = sentiment_df['date'].max().strftime('%Y-%m-%d')
+    combined = run_backtest(load_prices(SYMBOL, start, end), sentiment_df)
 
-print(combined[['date','close','sentiment_score','signal','cum_strategy','cum_buyhold']].tail(10))
+    print(combined[['date','close','sentiment_score','signal','cum_strategy','cum_buyhold']].tail(10))
 
-# Save to CSV for further analysis or plotting
-combined.to_csv('sentiment_backtest_results.csv', index=False)
-print('Backtest complete. Results saved in sentiment_backtest_results.csv')
+    # Save to CSV for further analysis or plotting
+    combined.to_csv('sentiment_backtest_results.csv', index=False)
+    print('Backtest complete. Results saved in sentiment_backtest_results.csv')
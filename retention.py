@@ -0,0 +1,257 @@
+"""Retention for news.db: a hot window, monthly archives and maintenance
+
+news.db keeps only the last HOT_DAYS of articles. Older rows (with their
+article_symbols entries) move to one SQLite file per publish month in the
+archive directory, e.g. news_archive/news_2025_01.db, with the same schema
+and indexes. The sentiment rollups stay in news.db, so series cover all of
+history. The `archives` table in news.db records each partition's publish
+time range.
+
+Readers go through spanning(): the hot database answers first, and archived
+partitions are opened only when the hot rows cannot fill the request and a
+partition overlaps the requested time range. Recent-news queries therefore
+cost the same however much history has been archived.
+
+run_due() archives and ANALYZEs once a day and VACUUMs once a week when
+enough of the file is free pages; scheduler.py calls it, or run it by hand:
+
+    python retention.py                 # whatever is due
+    python retention.py --force         # archive, analyze and vacuum now
+    python retention.py --status        # partitions and their ranges
+"""
+import os
+import math
+import time
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+
+HOT_DAYS = int(os.environ.get('NEWS_HOT_DAYS', 90))
+ARCHIVE_DIR = os.environ.get('NEWS_ARCHIVE_DIR')    # default: news_archive/ next to the DB
+BATCH = 5000                    # rows moved per transaction
+ARCHIVE_EVERY = 86400           # seconds between archive + ANALYZE passes
+VACUUM_EVERY = 7 * 86400
+VACUUM_MIN_FREE = 0.25          # VACUUM only if at least this share of pages is free
+
+_TABLES = ('articles', 'article_symbols')
+
+
+def archive_dir(db_path):
+    return ARCHIVE_DIR or os.path.join(os.path.dirname(os.path.abspath(db_path)), 'news_archive')
+
+
+def init_retention(conn):
+    """Create the partition catalog and the maintenance log"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS archives
+                    (partition TEXT PRIMARY KEY,
+                     min_ts INTEGER,
+                     max_ts INTEGER,
+                     n INTEGER)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS maintenance
+                    (task TEXT PRIMARY KEY,
+                     last_run REAL)''')
+
+
+def _month_bounds(ts):
+    """[start, end) epoch seconds of the UTC month containing ts"""
+    day = datetime.fromtimestamp(ts, timezone.utc)
+    start = datetime(day.year, day.month, 1, tzinfo=timezone.utc)
+    end = datetime(day.year + day.month // 12, day.month % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(start.timestamp()), int(end.timestamp()), start.strftime('news_%Y_%m.db')
+
+
+def _create_partition(conn, path):
+    """Give a new archive file the hot database's table and index definitions"""
+    schema = [sql for (sql,) in conn.execute(
+        f"SELECT sql FROM main.sqlite_master WHERE tbl_name IN ({','.join('?' * len(_TABLES))}) "
+        "AND sql IS NOT NULL ORDER BY type DESC", _TABLES)]    # tables before indexes
+    archive = sqlite3.connect(path)
+    try:
+        if not archive.execute("SELECT 1 FROM sqlite_master WHERE name = 'articles'").fetchone():
+            for sql in schema:
+                archive.execute(sql)
+            archive.commit()
+    finally:
+        archive.close()
+
+
+def archive_old_articles(conn, db_path, hot_days=HOT_DAYS, now=None):
+    """Move articles published more than hot_days ago into monthly partitions
+
+    Returns the number of rows moved. Each batch is copied and deleted in one
+    transaction, so an interrupted run loses nothing and can simply be re-run.
+    """
+    init_retention(conn)
+    cutoff = int(now or time.time()) - hot_days * 86400
+    folder = archive_dir(db_path)
+    columns = ', '.join(row[1] for row in conn.execute('PRAGMA table_info(articles)'))
+    symbols = [sym for (sym,) in conn.execute('SELECT DISTINCT symbol FROM article_symbols')]
+    moved = 0
+
+    while True:
+        (oldest,) = conn.execute('SELECT MIN(published_ts) FROM articles').fetchone()
+        if oldest is None or oldest >= cutoff:
+            break
+        start, end, name = _month_bounds(oldest)
+        end = min(end, cutoff)
+        os.makedirs(folder, exist_ok=True)
+        _create_partition(conn, os.path.join(folder, name))
+        conn.execute('ATTACH DATABASE ? AS archive', (os.path.join(folder, name),))
+        try:
+            while True:
+                ids = [id_ for (id_,) in conn.execute(
+                    'SELECT id FROM articles WHERE published_ts >= ? AND published_ts < ? LIMIT ?',
+                    (start, end, BATCH))]
+                if not ids:
+                    break
+                marks = ','.join('?' * len(ids))
+                conn.execute(f'INSERT OR IGNORE INTO archive.articles ({columns}) '
+                             f'SELECT {columns} FROM main.articles WHERE id IN ({marks})', ids)
+                lo, hi = conn.execute(f'SELECT MIN(published_ts), MAX(published_ts) FROM main.articles '
+                                      f'WHERE id IN ({marks})', ids).fetchone()
+                for sym in symbols:
+                    # (symbol, published_ts) is the key prefix, so these are range scans
+                    conn.execute(f'''INSERT OR IGNORE INTO archive.article_symbols
+                                     SELECT * FROM main.article_symbols
+                                     WHERE symbol = ? AND published_ts BETWEEN ? AND ?
+                                       AND article_id IN ({marks})''', [sym, lo, hi] + ids)
+                    conn.execute(f'''DELETE FROM main.article_symbols
+                                     WHERE symbol = ? AND published_ts BETWEEN ? AND ?
+                                       AND article_id IN ({marks})''', [sym, lo, hi] + ids)
+                conn.execute(f'DELETE FROM main.articles WHERE id IN ({marks})', ids)
+                conn.commit()
+                moved += len(ids)
+
+            conn.execute('''INSERT INTO archives (partition, min_ts, max_ts, n)
+                            SELECT ?, MIN(published_ts), MAX(published_ts), COUNT(*)
+                            FROM archive.articles
+                            WHERE true
+                            ON CONFLICT(partition) DO UPDATE SET
+                                min_ts = excluded.min_ts, max_ts = excluded.max_ts, n = excluded.n''',
+                         (name,))
+            conn.commit()
+        finally:
+            conn.execute('DETACH DATABASE archive')
+    return moved
+
+
+def partitions(conn, db_path, since=None, until=None):
+    """Archive files overlapping [since, until), newest first, as (path, min_ts, max_ts)"""
+    try:
+        rows = conn.execute('SELECT partition, min_ts, max_ts FROM archives ORDER BY max_ts DESC').fetchall()
+    except sqlite3.OperationalError:
+        return []    # nothing archived yet
+    folder = archive_dir(db_path)
+    return [(os.path.join(folder, name), min_ts, max_ts) for name, min_ts, max_ts in rows
+            if (since is None or max_ts >= since) and (until is None or min_ts < until)]
+
+
+def spanning(conn, db_path, query, limit, since=None, until=None):
+    """Up to limit rows from query(connection), newest first, across hot and archived data
+
+    query must return rows whose last column is published_ts, newest first.
+    Archives are read only while the result is short of limit or could still
+    hold newer rows than the oldest one kept. A negative limit means no limit,
+    as in SQLite's LIMIT -1.
+    """
+    if limit < 0:
+        limit = math.inf
+    rows = query(conn)
+    if len(rows) >= limit:
+        return rows[:limit]
+    for path, _, max_ts in partitions(conn, db_path, since, until):
+        if len(rows) >= limit and max_ts < rows[limit - 1][-1]:
+            break
+        archive = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows += query(archive)
+        finally:
+            archive.close()
+        rows.sort(key=lambda row: row[-1], reverse=True)
+    return rows if limit == math.inf else rows[:limit]
+
+
+def all_databases(db_path):
+    """The hot database followed by every archive partition, oldest first"""
+    conn = sqlite3.connect(db_path)
+    try:
+        paths = [path for path, _, _ in reversed(partitions(conn, db_path))]
+    finally:
+        conn.close()
+    return [db_path] + paths
+
+
+def analyze(conn):
+    """Refresh the query planner's statistics"""
+    conn.execute('ANALYZE')
+    conn.commit()
+
+
+def vacuum_if_fragmented(conn, min_free=VACUUM_MIN_FREE):
+    """VACUUM when at least min_free of the file is free pages; returns True if it ran"""
+    (free,) = conn.execute('PRAGMA freelist_count').fetchone()
+    (pages,) = conn.execute('PRAGMA page_count').fetchone()
+    if not pages or free / pages < min_free:
+        return False
+    conn.execute('VACUUM')
+    return True
+
+
+def _last_run(conn, task):
+    row = conn.execute('SELECT last_run FROM maintenance WHERE task = ?', (task,)).fetchone()
+    return row[0] if row else 0.0
+
+
+def _mark_run(conn, task, now):
+    conn.execute('''INSERT INTO maintenance (task, last_run) VALUES (?, ?)
+                    ON CONFLICT(task) DO UPDATE SET last_run = excluded.last_run''', (task, now))
+    conn.commit()
+
+
+def run_due(conn, db_path, force=False, now=None):
+    """Run whichever of archive/ANALYZE/VACUUM is due; returns a summary dict"""
+    init_retention(conn)
+    conn.commit()
+    now = now or time.time()
+    summary = {}
+    if force or now - _last_run(conn, 'archive') >= ARCHIVE_EVERY:
+        summary['archived'] = archive_old_articles(conn, db_path, now=now)
+        analyze(conn)
+        _mark_run(conn, 'archive', now)
+    if force or now - _last_run(conn, 'vacuum') >= VACUUM_EVERY:
+        summary['vacuumed'] = vacuum_if_fragmented(conn, 0.0 if force else VACUUM_MIN_FREE)
+        _mark_run(conn, 'vacuum', now)
+    return summary
+
+
+if __name__ == "__main__":
+    from scraper import DB_PATH, init_db
+
+    parser = argparse.ArgumentParser(description='Archive old articles and maintain news.db')
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--force', action='store_true', help='archive, analyze and vacuum now')
+    parser.add_argument('--status', action='store_true', help='list archive partitions')
+    args = parser.parse_args()
+
+    init_db(args.db)
+    conn = sqlite3.connect(args.db)
+    init_retention(conn)
+
+    if args.status:
+        (hot,) = conn.execute('SELECT COUNT(*) FROM articles').fetchone()
+        print(f"Hot: {hot} articles (last {HOT_DAYS} days) in {args.db}")
+        for path, min_ts, max_ts in reversed(partitions(conn, args.db)):
+            (n,) = conn.execute('SELECT n FROM archives WHERE partition = ?',
+                                (os.path.basename(path),)).fetchone()
+            print(f"  {path}: {n} articles, "
+                  f"{datetime.fromtimestamp(min_ts, timezone.utc):%Y-%m-%d} to "
+                  f"{datetime.fromtimestamp(max_ts, timezone.utc):%Y-%m-%d}")
+    else:
+        summary = run_due(conn, args.db, force=args.force)
+        if not summary:
+            print("Nothing due")
+        if 'archived' in summary:
+            print(f"✓ Archived {summary['archived']} articles to {archive_dir(args.db)} and ran ANALYZE")
+        if 'vacuumed' in summary:
+            print("✓ VACUUM done" if summary['vacuumed'] else "✓ VACUUM skipped (little free space)")
+    conn.close()
@@ -0,0 +1,134 @@
+"""Pre-aggregated sentiment rollups stored alongside articles in news.db
+
+Every new article is added to one row per granularity for each of:
+all news (source='*', symbol='*'), its source, and each symbol it mentions.
+Readers get compact series instead of scanning the articles table.
+
+n, the label counts and score_sum count each story once. A near-duplicate
+of a story from another source (see dedup.py) only adds to confirmations and
+confirmed_score_sum, so readers choose how much a confirmation is worth
+(weighted_score).
+"""
+
+# Bucket width in seconds for each granularity
+GRANULARITIES = {
+    '1m': 60,
+    '1h': 3600,
+    '1d': 86400,
+}
+
+ALL = '*'
+
+
+def init_rollups(conn):
+    """Create the rollup table; returns True if it did not exist before"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                          "AND name = 'sentiment_rollups'").fetchone()
+    conn.execute('''CREATE TABLE IF NOT EXISTS sentiment_rollups
+                    (granularity TEXT,
+                     bucket INTEGER,
+                     source TEXT,
+                     symbol TEXT,
+                     n INTEGER,
+                     positive INTEGER,
+                     negative INTEGER,
+                     neutral INTEGER,
+                     score_sum REAL,
+                     confirmations INTEGER DEFAULT 0,
+                     confirmed_score_sum REAL DEFAULT 0,
+                     PRIMARY KEY (granularity, source, symbol, bucket))
+                    WITHOUT ROWID''')
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(sentiment_rollups)')]
+    if 'confirmations' not in columns:
+        conn.execute('ALTER TABLE sentiment_rollups ADD COLUMN confirmations INTEGER DEFAULT 0')
+        conn.execute('ALTER TABLE sentiment_rollups ADD COLUMN confirmed_score_sum REAL DEFAULT 0')
+    return exists is None
+
+
+def update_rollups(conn, items):
+    """Add articles to the rollups
+
+    items: iterable of (published_epoch, source, symbols, score, label, confirmation),
+    confirmation being True for another source's copy of an already counted story.
+    The caller commits, so rollups land in the same transaction as the articles.
+    """
+    deltas = {}
+    for epoch, source, symbols, score, label, confirmation in items:
+        if epoch is None:
+            continue            # no usable timestamp, so no bucket
+        keys = [(ALL, ALL), (source, ALL)] + [(ALL, sym) for sym in symbols]
+        for granularity, width in GRANULARITIES.items():
+            bucket = epoch - epoch % width
+            for src, sym in keys:
+                d = deltas.setdefault((granularity, bucket, src, sym), [0, 0, 0, 0, 0.0, 0, 0.0])
+                if confirmation:
+                    d[5] += 1
+                    d[6] += score
+                    continue
+                d[0] += 1
+                if label == 'positive':
+                    d[1] += 1
+                elif label == 'negative':
+                    d[2] += 1
+                else:
+                    d[3] += 1
+                d[4] += score
+
+    conn.executemany('''INSERT INTO sentiment_rollups
+                        (granularity, bucket, source, symbol, n, positive, negative, neutral, score_sum,
+                         confirmations, confirmed_score_sum)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT(granularity, source, symbol, bucket) DO UPDATE SET
+                            n = n + excluded.n,
+                            positive = positive + excluded.positive,
+                            negative = negative + excluded.negative,
+                            neutral = neutral + excluded.neutral,
+                            score_sum = score_sum + excluded.score_sum,
+                            confirmations = confirmations + excluded.confirmations,
+                            confirmed_score_sum = confirmed_score_sum + excluded.confirmed_score_sum''',
+                     [key + tuple(d) for key, d in deltas.items()])
+
+
+def get_series(conn, granularity='1d', since=None, until=None, source=ALL, symbol=ALL):
+    """Return rollup points for [since, until) as dicts, oldest first
+
+    since/until are epoch seconds; either may be None for an open range.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}. Use: {', '.join(GRANULARITIES)}")
+
+    sql = '''SELECT bucket, n, positive, negative, neutral, score_sum,
+                    confirmations, confirmed_score_sum
+             FROM sentiment_rollups
+             WHERE granularity = ? AND source = ? AND symbol = ?'''
+    params = [granularity, source, symbol]
+    if since is not None:
+        sql += ' AND bucket >= ?'
+        params.append(since - since % GRANULARITIES[granularity])
+    if until is not None:
+        sql += ' AND bucket < ?'
+        params.append(until)
+    sql += ' ORDER BY bucket'
+
+    return [{'bucket': bucket,
+             'count': n,
+             'positive': pos,
+             'negative': neg,
+             'neutral': neu,
+             'score_sum': score_sum,
+             'avg_score': score_sum / n if n else 0.0,
+             'confirmations': confirmations,
+             'confirmed_score_sum': confirmed_score_sum}
+            for bucket, n, pos, neg, neu, score_sum, confirmations, confirmed_score_sum
+            in conn.execute(sql, params)]
+
+
+def weighted_score(points, confirmation_weight):
+    """Average score over series points, each story counted once plus
+    confirmation_weight for every other source that ran it
+
+    0 counts every story once; 1 counts every article, as before deduplication.
+    """
+    n = sum(p['count'] + confirmation_weight * p['confirmations'] for p in points)
+    total = sum(p['score_sum'] + confirmation_weight * p['confirmed_score_sum'] for p in points)
+    return total / n if n else 0.0
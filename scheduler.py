@@ -1,28 +1,240 @@
-import schedule
+"""Adaptive RSS polling for every feed in the registry (see feeds.py)
+
+Each feed gets its own interval: roughly the time it takes to publish
+TARGET_NEW_PER_POLL new articles, estimated from the publish times in the
+feed and kept within the feed's min/max bounds. Due feeds come off a
+priority queue (a heap keyed by next poll time) and are downloaded on a
+thread pool with at most MAX_PER_HOST requests per host at once; unchanged
+feeds cost a 304 thanks to ETag/Last-Modified. Entries are stored from the
+scheduler thread, so news.db keeps a single writer. A failing feed backs
+off exponentially until it recovers. Retention (archiving, ANALYZE,
+VACUUM; see retention.py) runs from here too when it is due.
+"""
 import time
-from scraper import fetch_and_store
+import heapq
+import itertools
+import sqlite3
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
+from urllib.parse import urlparse
+from scraper import DB_PATH, init_db, fetch_feed, store_entries, parse_published
+from feeds import init_feeds, load_feeds, save_state
+from dedup import StoryIndex
+from retention import run_due
+
+MAX_WORKERS = 8              # feeds downloaded at once
+MAX_PER_HOST = 2             # of which at most this many from one host
+TARGET_NEW_PER_POLL = 1.0    # aim for about one new article per poll
+RATE_SMOOTHING = 0.5         # weight of the newest publish-rate estimate
+MAX_BACKOFF = 6 * 3600       # longest wait after repeated errors
+REGISTRY_REFRESH = 300       # re-read the registry (added/disabled feeds) this often
+INDEX_REFRESH = 900          # reload the dedup window (picks up other writers)
+MAINTENANCE_CHECK = 3600     # how often to check whether retention work is due
+
+
+def observed_rate(entries, now, since=None, new=0):
+    """Articles per second, from the feed's publish times
+
+    Uses the span from the oldest entry to now; feeds without dates fall back
+    to the number of new entries since the previous poll.
+    """
+    times = [ts for ts in (parse_published(e.get('published', '')) for e in entries) if ts is not None]
+    if len(times) >= 2:
+        return len(times) / max(now - min(times), 60)
+    if since:
+        return new / max(now - since, 1)
+    return None
+
+
+def next_interval(feed, rate, new, seen):
+    """Update the feed's rate estimate and return its next interval"""
+    if rate is not None:
+        previous = feed['rate']
+        feed['rate'] = rate if previous is None else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * previous
+    if new and new == seen and feed['last_polled']:
+        # Everything in the feed was new: entries may have scrolled off unseen
+        interval = feed['min_interval']
+    elif feed['rate']:
+        interval = TARGET_NEW_PER_POLL / feed['rate']
+    else:
+        interval = feed['max_interval']
+    return min(max(interval, feed['min_interval']), feed['max_interval'])
+
+
+def record_poll(conn, stories, feed, fetch):
+    """Store the result of fetch() -> (entries, etag, modified) for feed, update its
+    polling state (next poll, validators, error backoff) and commit
+
+    Shared by FeedScheduler and scraper.fetch_and_store, so a one-shot scrape
+    leaves the registry as a scheduler poll would. Returns the new article count.
+    """
+    now = time.time()
+    new = 0
+    try:
+        entries, etag, modified = fetch()
+        new = store_entries(conn, stories, feed['name'], entries)
+    except Exception as e:
+        conn.rollback()
+        feed['errors'] += 1
+        feed['last_error'] = str(e)[:200]
+        delay = min(feed['interval'] * 2 ** feed['errors'], MAX_BACKOFF)
+        print(f"✗ {feed['name']} failed ({feed['errors']} in a row): {e}; retrying in {delay:.0f}s")
+    else:
+        rate = observed_rate(entries, now, feed['last_polled'], new)
+        delay = next_interval(feed, rate, new, len(entries))
+        feed.update(interval=delay, errors=0, last_error=None, etag=etag, modified=modified)
+        status = f"{len(entries)} entries, {new} new" if entries else "not modified"
+        print(f"✓ {feed['name']}: {status}; next poll in {delay:.0f}s")
+
+    feed['last_polled'] = now
+    feed['next_poll'] = now + delay
+    save_state(conn, feed)
+    conn.commit()
+    return new
+
+
+class FeedScheduler:
+    """Polls the registry's feeds until stopped"""
+
+    def __init__(self, db_path=None, max_workers=MAX_WORKERS, max_per_host=MAX_PER_HOST):
+        self.db_path = db_path or DB_PATH
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.feeds = {}                      # name -> feed dict (see feeds.STATE_COLUMNS)
+        self.queue = []                      # heap of (next_poll, name, generation)
+        self.generation = {}                 # name -> generation of its live queue entry
+        self._generations = itertools.count()
+        self.in_flight = {}                  # future -> feed
+        self.busy = Counter()                # host -> requests in flight
+        self.waiting = defaultdict(deque)    # host -> (feed, generation) held back by MAX_PER_HOST
+        self.conn = None
+        self.stories = None
+        self.registry_loaded = 0.0
+        self.index_loaded = 0.0
+        self.maintenance_checked = 0.0
+
+    def schedule(self, feed):
+        """Queue the feed's next poll; any entry queued for it before becomes stale"""
+        generation = self.generation[feed['name']] = next(self._generations)
+        heapq.heappush(self.queue, (feed['next_poll'], feed['name'], generation))
+
+    def refresh_registry(self, now):
+        """Pick up added, changed and disabled feeds"""
+        current = {feed['name']: feed for feed in load_feeds(self.conn)}
+        for name in list(self.feeds):
+            if name not in current:
+                del self.feeds[name]         # disabled: its queue entry is skipped
+                del self.generation[name]
+        polling = [feed['name'] for feed in self.in_flight.values()]
+        for name, feed in current.items():
+            known = self.feeds.get(name)
+            if known is None or known['url'] != feed['url']:
+                self.feeds[name] = feed
+                self.schedule(feed)
+                continue
+            known['min_interval'] = feed['min_interval']
+            known['max_interval'] = feed['max_interval']
+            # feeds.py add resets next_poll and the validators; a feed being
+            # polled right now saves its own state when the poll finishes
+            if known['next_poll'] != feed['next_poll'] and name not in polling:
+                known.update(next_poll=feed['next_poll'], etag=feed['etag'], modified=feed['modified'])
+                self.schedule(known)
+        self.registry_loaded = now
+
+    def dispatch(self, pool, now):
+        """Start every due feed there is capacity for, held-back ones first"""
+        for host, held in self.waiting.items():
+            while held and self.busy[host] < self.max_per_host and len(self.in_flight) < self.max_workers:
+                feed, generation = held.popleft()
+                if self.generation.get(feed['name']) == generation:
+                    self.start(pool, feed, host)
+
+        while self.queue and self.queue[0][0] <= now and len(self.in_flight) < self.max_workers:
+            due, name, generation = heapq.heappop(self.queue)
+            feed = self.feeds.get(name)
+            if feed is None or self.generation.get(name) != generation:
+                continue                     # disabled or rescheduled since queued
+            host = urlparse(feed['url']).hostname
+            if self.busy[host] >= self.max_per_host:
+                self.waiting[host].append((feed, generation))
+                continue
+            self.start(pool, feed, host)
+
+    def start(self, pool, feed, host):
+        self.busy[host] += 1
+        future = pool.submit(fetch_feed, feed['url'], feed['etag'], feed['modified'])
+        self.in_flight[future] = feed
+
+    def finish(self, future):
+        """Store a finished download and schedule the feed's next poll"""
+        feed = self.in_flight.pop(future)
+        self.busy[urlparse(feed['url']).hostname] -= 1
+        record_poll(self.conn, self.stories, feed, future.result)
+        if self.feeds.get(feed['name']) is feed:
+            self.schedule(feed)
+
+    def maintain(self, now):
+        """Archive old articles and ANALYZE/VACUUM when due (downloads keep running)"""
+        self.maintenance_checked = now
+        try:
+            summary = run_due(self.conn, self.db_path)
+        except sqlite3.Error as e:
+            print(f"✗ Retention failed: {e}")
+            return
+        if summary.get('archived'):
+            print(f"🗄 Archived {summary['archived']} articles older than the hot window")
+
+    def run(self, stop_event=None):
+        init_db(self.db_path)
+        self.conn = sqlite3.connect(self.db_path)
+        init_feeds(self.conn)
+        self.conn.commit()
+        print(f"📰 Polling started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="feed") as pool:
+            try:
+                while not (stop_event and stop_event.is_set()):
+                    now = time.time()
+                    if now - self.registry_loaded >= REGISTRY_REFRESH:
+                        self.refresh_registry(now)
+                    if now - self.index_loaded >= INDEX_REFRESH:
+                        self.stories = StoryIndex.load(self.conn, since=int(now))
+                        self.index_loaded = now
+
+                    if now - self.maintenance_checked >= MAINTENANCE_CHECK:
+                        self.maintain(now)
+
+                    self.dispatch(pool, now)
+
+                    # Wake for the next due feed or finished download, at least once a second
+                    timeout = 1.0
+                    if self.queue and len(self.in_flight) < self.max_workers:
+                        timeout = min(max(self.queue[0][0] - now, 0), 1.0)
+                    if self.in_flight:
+                        done, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self.finish(future)
+                    elif stop_event:
+                        stop_event.wait(timeout)
+                    else:
+                        time.sleep(timeout)
+            finally:
+                for future in self.in_flight:
+                    future.cancel()
+                self.conn.close()
+
+
+def run_forever(stop_event=None):
+    """Poll every registered feed adaptively until stop_event is set"""
+    FeedScheduler().run(stop_event)
+
+
+if __name__ == "__main__":
+    print("🚀 Scheduler started. Polling each feed as often as it publishes...")
+    print("Press Ctrl+C to stop.\n")
 
-def job():
-    """Run the scraper"""
-    print(f"\n{'='*60}")
-    print(f"📰 SCRAPER RUN: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*60}")
-    fetch_and_store()
-
-# Schedule every 5 minutes
-schedule.every(5).minutes.do(job)
-
-print("🚀 Scheduler started. Scraping every 5 minutes...")
-print("Press Ctrl+C to stop.\n")
-
-# Run initial job
-job()
-
-# Keep running
-try:
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
-except KeyboardInterrupt:
-    print("\n⏹ Scheduler stopped.")
+    try:
+        run_forever()
+    except KeyboardInterrupt:
+        print("\n⏹ Scheduler stopped.")
@@ -1,22 +1,97 @@
-import feedparser
+import os
+import re
 import sqlite3
+import gzip
+import time
 import hashlib
-from datetime import datetime
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from rollups import init_rollups, update_rollups
+from dedup import StoryIndex, simhash, to_db, WINDOW
+from retention import spanning
+from sentiment_common import SYMBOLS, get_analyzer
 
-# Initialize VADER sentiment analyzer
-analyzer = SentimentIntensityAnalyzer()
+# feedparser and the VADER analyzer are loaded on first use, so importing
+# this module (e.g. from api.py) stays cheap
 
-# RSS feeds for finance news
+# SQLite database shared by the scraper, the API and the backfill tools
+DB_PATH = os.environ.get('NEWS_DB', 'news.db')
+
+# RSS feeds for finance news (seeds the feed registry, see feeds.py)
 FEEDS = {
     'bloomberg': 'https://feeds.bloomberg.com/markets/news.rss',
     'reuters': 'https://feeds.reuters.com/reuters/businessNews',
     'cnbc': 'https://search.cnbc.com/rs/search/combinedcms/view.xml?partnerId=wrss01&id=100003114'
 }
 
-def init_db():
-    """Create SQLite database for storing articles"""
-    conn = sqlite3.connect('news.db')
+FETCH_TIMEOUT = 20  # seconds per feed request
+
+# news.db schema version (PRAGMA user_version); bump when migrate() changes
+SCHEMA_VERSION = 1
+MIGRATE_TIMEOUT = 600  # seconds init_db waits for another process's migration
+
+# Symbols tracked in the per-symbol rollups (SYMBOLS in sentiment_common.py)
+_SYMBOL_PATTERNS = {sym: re.compile(r'\b(' + '|'.join(map(re.escape, words)) + r')\b', re.I)
+                    for sym, words in SYMBOLS.items()}
+
+def tag_symbols(text):
+    """Return the tracked symbols mentioned in text"""
+    return [sym for sym, pattern in _SYMBOL_PATTERNS.items() if pattern.search(text)]
+
+def parse_published(published, fallback=None):
+    """Parse an RFC 822 or ISO 8601 timestamp into epoch seconds (UTC)"""
+    for parse in (parsedate_to_datetime, lambda s: datetime.fromisoformat(s.replace('Z', '+00:00'))):
+        try:
+            dt = parse(published)
+        except (TypeError, ValueError, IndexError):
+            continue
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return int(dt.timestamp())
+    return fallback
+
+def published_epoch(published, fetched_at=None):
+    """Epoch seconds for an article: its publish time, else when it was fetched"""
+    ts = parse_published(published)
+    if ts is None:
+        try:
+            ts = int(datetime.fromisoformat(fetched_at).timestamp())  # local time
+        except (TypeError, ValueError):
+            ts = int(datetime.now().timestamp())
+    return ts
+
+def schema_version(conn):
+    """news.db's schema version (PRAGMA user_version; 0 until init_db has run)"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def init_db(db_path=None):
+    """Create SQLite database for storing articles (defaults to DB_PATH)
+
+    Migrations and rebuilds run at most once per database: they happen inside
+    BEGIN IMMEDIATE and set user_version to SCHEMA_VERSION, so a second
+    process calling init_db waits for the first and then finds nothing to do.
+    """
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=MIGRATE_TIMEOUT, isolation_level=None)
+    try:
+        # WAL lets API reads proceed while the scraper is writing
+        conn.execute('PRAGMA journal_mode=WAL')
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if schema_version(conn) < SCHEMA_VERSION:    # another process may have migrated meanwhile
+                migrate(conn)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+
+def migrate(conn):
+    """Bring the tables up to SCHEMA_VERSION (inside init_db's transaction)"""
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS articles
                  (id INTEGER PRIMARY KEY, 
@@ -28,13 +103,129 @@ def init_db():
                   published TEXT,
                   sentiment_score REAL,
                   sentiment_label TEXT,
-                  fetched_at TEXT)''')
-    conn.commit()
-    conn.close()
+                  fetched_at TEXT,
+                  published_ts INTEGER,
+                  cluster_id INTEGER,
+                  simhash INTEGER)''')
+    migrate_published_ts(conn)
+    migrate_clusters(conn)
+    if init_symbol_index(conn):
+        rebuild_symbol_index(conn)
+    if init_rollups(conn):
+        rebuild_rollups(conn)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+def migrate_published_ts(conn):
+    """Add and backfill published_ts on databases created before it existed"""
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(articles)')]
+    if 'published_ts' not in columns:
+        conn.execute('ALTER TABLE articles ADD COLUMN published_ts INTEGER')
+        rows = conn.execute('SELECT id, published, fetched_at FROM articles').fetchall()
+        conn.executemany('UPDATE articles SET published_ts = ? WHERE id = ?',
+                         [(published_epoch(published, fetched_at), id_)
+                          for id_, published, fetched_at in rows])
+    # Time-window queries (optionally per sentiment label) become index range scans
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_articles_published_ts '
+                 'ON articles (published_ts)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_articles_label_published_ts '
+                 'ON articles (sentiment_label, published_ts)')
+
+def migrate_clusters(conn):
+    """Add cluster_id/simhash on databases created before story clustering
+
+    Existing articles each become their own story; only those inside the
+    dedup window are fingerprinted, so new articles can still match them.
+    """
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(articles)')]
+    if 'cluster_id' not in columns:
+        conn.execute('ALTER TABLE articles ADD COLUMN cluster_id INTEGER')
+        conn.execute('ALTER TABLE articles ADD COLUMN simhash INTEGER')
+        conn.execute('UPDATE articles SET cluster_id = id')
+        rows = conn.execute('SELECT id, title, summary FROM articles WHERE published_ts >= ?',
+                            (int(time.time()) - WINDOW,)).fetchall()
+        fingerprints = ((simhash(f"{title} {summary}"), id_) for id_, title, summary in rows)
+        conn.executemany('UPDATE articles SET simhash = ? WHERE id = ?',
+                         [(to_db(fp), id_) for fp, id_ in fingerprints if fp is not None])
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_articles_cluster_id ON articles (cluster_id)')
+
+def init_symbol_index(conn):
+    """Create the symbol -> article index; returns True if it did not exist before"""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                          "AND name = 'article_symbols'").fetchone()
+    # Keyed (symbol, published_ts) so a symbol's newest articles are one range scan
+    conn.execute('''CREATE TABLE IF NOT EXISTS article_symbols
+                    (symbol TEXT,
+                     published_ts INTEGER,
+                     article_id INTEGER,
+                     PRIMARY KEY (symbol, published_ts, article_id))
+                    WITHOUT ROWID''')
+    return exists is None
+
+def rebuild_symbol_index(conn):
+    """Re-tag every stored article (first run on an existing DB)"""
+    conn.execute('DELETE FROM article_symbols')
+    rows = conn.execute('SELECT id, title, summary, published_ts FROM articles')
+    conn.executemany('INSERT OR IGNORE INTO article_symbols (symbol, published_ts, article_id) '
+                     'VALUES (?, ?, ?)',
+                     ((sym, published_ts, id_)
+                      for id_, title, summary, published_ts in rows
+                      for sym in tag_symbols(f"{title} {summary}")))
+
+def classify_article(stories, title, summary, published_ts):
+    """Fingerprint an article and score it, reusing the sentiment of a near-duplicate story
+
+    Returns (fingerprint, cluster_id, score, label); cluster_id is None for a new story.
+    """
+    text = f"{title} {summary}"
+    fingerprint = simhash(text)
+    cluster_id = stories.match(fingerprint, published_ts) if fingerprint is not None else None
+    if cluster_id is None:
+        score, label = analyze_sentiment(text)
+    else:
+        story = stories.stories[cluster_id]
+        score, label = story['score'], story['label']
+    return fingerprint, cluster_id, score, label
+
+def index_article(conn, stories, article_id, title, summary, source, published_ts,
+                  score, label, fingerprint, cluster_id):
+    """Tag a newly stored article and file it under its story
+
+    Returns its rollup item, or None if its source already ran the story.
+    """
+    symbols = tag_symbols(f"{title} {summary}")
+    conn.executemany('INSERT OR IGNORE INTO article_symbols (symbol, published_ts, article_id) '
+                     'VALUES (?, ?, ?)',
+                     [(sym, published_ts, article_id) for sym in symbols])
+    if cluster_id is None:
+        cluster_id = article_id
+        conn.execute('UPDATE articles SET cluster_id = ? WHERE id = ?', (cluster_id, article_id))
+    role = 'story'  # articles without words cannot be matched
+    if fingerprint is not None:
+        role = stories.add(fingerprint, published_ts, cluster_id, source, score, label)
+    if role is None:
+        return None
+    return (published_ts, source, symbols, score, label, role == 'confirmation')
+
+def rebuild_rollups(conn):
+    """Recompute all rollups from the articles table (first run on an existing DB)"""
+    conn.execute('DELETE FROM sentiment_rollups')
+    # A later article of a story is a confirmation if its source had not run the story yet
+    rows = conn.execute('''SELECT a.title, a.summary, a.source, a.published_ts,
+                                  a.sentiment_score, a.sentiment_label,
+                                  COALESCE(a.cluster_id, a.id) != a.id,
+                                  EXISTS (SELECT 1 FROM articles b
+                                          WHERE b.cluster_id = a.cluster_id AND b.source = a.source
+                                            AND b.id < a.id)
+                           FROM articles a
+                           WHERE a.published_ts IS NOT NULL''')
+    update_rollups(conn, ((published_ts, source, tag_symbols(f"{title} {summary}"), score, label,
+                           bool(duplicate))
+                          for title, summary, source, published_ts, score, label, duplicate, repeat
+                          in rows if not repeat))
 
 def analyze_sentiment(text):
     """Analyze sentiment and return score + label"""
-    scores = analyzer.polarity_scores(text)
+    scores = get_analyzer().polarity_scores(text)
     compound = scores['compound']
     
     # Label: positive, neutral, negative
@@ -47,76 +238,215 @@ def analyze_sentiment(text):
     
     return compound, label
 
+def fetch_feed(feed_url, etag=None, modified=None, timeout=FETCH_TIMEOUT):
+    """Download and parse one feed, as a conditional GET when etag/modified are known
+
+    Returns (entries, etag, modified); entries is empty if the feed has not
+    changed (304). Network and HTTP errors are raised.
+    """
+    import feedparser
+    headers = {'User-Agent': feedparser.USER_AGENT, 'Accept-Encoding': 'gzip'}
+    if etag:
+        headers['If-None-Match'] = etag
+    if modified:
+        headers['If-Modified-Since'] = modified
+    try:
+        with urllib.request.urlopen(urllib.request.Request(feed_url, headers=headers),
+                                    timeout=timeout) as resp:
+            body = resp.read()
+            if resp.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            etag, modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return [], etag, modified
+        raise
+    return feedparser.parse(body).entries, etag, modified
+
+def store_entries(conn, stories, source_name, entries):
+    """Score and store a feed's new entries; returns how many were new
+
+    Entries already in the database are skipped before any scoring, so a
+    feed can be stored whole on every poll. The caller commits.
+    """
+    by_hash = {}
+    for entry in entries:
+        by_hash.setdefault(hashlib.md5(entry.get('link', '').encode()).hexdigest(), entry)
+    hashes = list(by_hash)
+    for i in range(0, len(hashes), 500):
+        chunk = hashes[i:i + 500]
+        placeholders = ','.join('?' * len(chunk))
+        for (existing,) in conn.execute(
+                f'SELECT url_hash FROM articles WHERE url_hash IN ({placeholders})', chunk):
+            del by_hash[existing]
+    
+    c = conn.cursor()
+    new_items = []
+    for url_hash, entry in by_hash.items():
+        fetched_at = datetime.now().isoformat()
+        published_ts = published_epoch(entry.get('published', ''), fetched_at)
+        
+        # Score title + summary, unless another source already ran the story
+        fingerprint, cluster_id, sentiment_score, sentiment_label = classify_article(
+            stories, entry.get('title', ''), entry.get('summary', ''), published_ts)
+        
+        try:
+            c.execute('''INSERT INTO articles 
+                        (url_hash, title, summary, url, source, published, 
+                         sentiment_score, sentiment_label, fetched_at, published_ts,
+                         cluster_id, simhash)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                     (url_hash,
+                      entry.get('title', ''),
+                      entry.get('summary', '')[:500],
+                      entry.get('link', ''),
+                      source_name,
+                      entry.get('published', ''),
+                      sentiment_score,
+                      sentiment_label,
+                      fetched_at,
+                      published_ts,
+                      cluster_id,
+                      to_db(fingerprint) if fingerprint is not None else None))
+        except sqlite3.IntegrityError:
+            continue  # stored by another writer in the meantime
+        new_items.append(index_article(conn, stories, c.lastrowid,
+                                       entry.get('title', ''), entry.get('summary', '')[:500],
+                                       source_name, published_ts,
+                                       sentiment_score, sentiment_label,
+                                       fingerprint, cluster_id))
+        duplicate = f" [same story as #{cluster_id}]" if cluster_id is not None else ''
+        print(f"  → {sentiment_label.upper()} ({sentiment_score:.2f}): {entry.get('title', '')[:60]}...{duplicate}")
+    
+    update_rollups(conn, [item for item in new_items if item is not None])
+    return len(new_items)
+
 def fetch_and_store(max_articles=50):
-    """Fetch all RSS feeds, analyze sentiment, and store new articles"""
+    """Fetch every enabled feed in the registry once, analyze sentiment, and store new articles
+
+    scheduler.py polls the feed registry adaptively instead; this is the
+    one-shot run used by `python scraper.py` and /scrape/now. Each feed's
+    polling state (ETag, next poll, errors) is saved the same way, so a
+    running scheduler picks it up.
+    """
+    from feeds import init_feeds, load_feeds
+    from scheduler import record_poll
     init_db()
-    conn = sqlite3.connect('news.db')
-    c = conn.cursor()
+    conn = sqlite3.connect(DB_PATH)
+    init_feeds(conn)
+    conn.commit()
     new_count = 0
+    stories = StoryIndex.load(conn, since=int(time.time()))
     
-    for source_name, feed_url in FEEDS.items():
-        try:
-            feed = feedparser.parse(feed_url)
-            print(f"✓ {source_name}: {len(feed.entries)} articles found")
-            
-            for entry in feed.entries[:20]:  # Top 20 per feed
-                url_hash = hashlib.md5(entry.get('link', '').encode()).hexdigest()
-                
-                # Combine title + summary for sentiment analysis
-                text_to_analyze = entry.get('title', '') + ' ' + entry.get('summary', '')
-                sentiment_score, sentiment_label = analyze_sentiment(text_to_analyze)
-                
-                try:
-                    c.execute('''INSERT INTO articles 
-                                (url_hash, title, summary, url, source, published, 
-                                 sentiment_score, sentiment_label, fetched_at)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                             (url_hash,
-                              entry.get('title', ''),
-                              entry.get('summary', '')[:500],
-                              entry.get('link', ''),
-                              source_name,
-                              entry.get('published', ''),
-                              sentiment_score,
-                              sentiment_label,
-                              datetime.now().isoformat()))
-                    new_count += 1
-                    print(f"  → {sentiment_label.upper()} ({sentiment_score:.2f}): {entry.get('title', '')[:60]}...")
-                except sqlite3.IntegrityError:
-                    pass  # Duplicate, skip
-        except Exception as e:
-            print(f"✗ {source_name} failed: {e}")
+    for feed in load_feeds(conn):
+        new_count += record_poll(conn, stories, feed,
+                                 lambda: fetch_feed(feed['url'], feed['etag'], feed['modified']))
     
-    conn.commit()
     conn.close()
     print(f"\n→ Stored {new_count} new articles\n")
     return new_count
 
-def get_latest_articles(limit=10, sentiment_filter=None):
-    """Retrieve latest articles from database
+# Columns get_latest_articles returns by default (also the API's article fields)
+ARTICLE_COLUMNS = ('title', 'summary', 'url', 'source', 'published',
+                   'sentiment_score', 'sentiment_label', 'published_ts', 'cluster_id')
+
+def get_latest_articles(limit=10, sentiment_filter=None, since=None, until=None,
+                        symbol=None, columns=ARTICLE_COLUMNS):
+    """Retrieve latest articles from database, newest published first
     sentiment_filter: 'positive', 'negative', 'neutral', or None for all
+    since / until: epoch seconds bounding published_ts (until is exclusive)
+    symbol: only articles tagged with this ticker (via article_symbols)
+    columns: which of ARTICLE_COLUMNS to return (rows follow this order)
+    Archived months (see retention.py) are searched only if the hot window
+    cannot fill limit.
     """
-    conn = sqlite3.connect('news.db')
-    c = conn.cursor()
-    
-    if sentiment_filter:
-        c.execute('''SELECT title, summary, url, source, published, sentiment_score, sentiment_label 
-                     FROM articles 
-                     WHERE sentiment_label = ? 
-                     ORDER BY fetched_at DESC LIMIT ?''', 
-                  (sentiment_filter, limit))
+    # published_ts last, for merging with archived rows
+    select = ', '.join(f'a.{col}' for col in columns) + ', a.published_ts'
+    if symbol:
+        # Walk the symbol's (published_ts) range, then fetch just those articles
+        where, params = time_window(since, until, column='s.published_ts')
+        where.insert(0, 's.symbol = ?')
+        params.insert(0, symbol.upper())
+        sql = f'''SELECT {select} FROM article_symbols s
+                  JOIN articles a ON a.id = s.article_id'''
+        order = 's.published_ts'
     else:
-        c.execute('''SELECT title, summary, url, source, published, sentiment_score, sentiment_label 
-                     FROM articles 
-                     ORDER BY fetched_at DESC LIMIT ?''', (limit,))
+        where, params = time_window(since, until, column='a.published_ts')
+        sql = f'SELECT {select} FROM articles a'
+        order = 'a.published_ts'
+    if sentiment_filter:
+        where.append('a.sentiment_label = ?')
+        params.append(sentiment_filter)
     
-    articles = c.fetchall()
-    conn.close()
-    return articles
+    sql = f'''{sql}
+              {'WHERE ' + ' AND '.join(where) if where else ''}
+              ORDER BY {order} DESC LIMIT ?'''
+    
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        articles = spanning(conn, DB_PATH, lambda db: db.execute(sql, params + [limit]).fetchall(),
+                            limit, since, until)
+    finally:
+        conn.close()
+    return [row[:-1] for row in articles]
+
+def search_articles(query, limit=10, since=None, until=None, columns=ARTICLE_COLUMNS):
+    """Articles whose title or summary contains query, newest published first
+    Without since only the hot window is searched: LIKE cannot use an index, so
+    scanning every archived month would make search cost grow with history.
+    With since, archived months overlapping [since, until) are searched too
+    when the hot window has fewer than limit matches.
+    """
+    search_term = f"%{query}%"
+    where, params = time_window(since, until)
+    where.insert(0, '(title LIKE ? OR summary LIKE ?)')
+    sql = f'''SELECT {', '.join(columns)}, published_ts
+              FROM articles
+              WHERE {' AND '.join(where)}
+              ORDER BY published_ts DESC LIMIT ?'''
+    params = [search_term, search_term] + params + [limit]
+    
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if since is None:
+            articles = conn.execute(sql, params).fetchall()
+        else:
+            articles = spanning(conn, DB_PATH, lambda db: db.execute(sql, params).fetchall(),
+                                limit, since, until)
+    finally:
+        conn.close()
+    return [row[:-1] for row in articles]
+
+def time_window(since=None, until=None, column='published_ts'):
+    """WHERE clauses and parameters for a published_ts range"""
+    where, params = [], []
+    if since is not None:
+        where.append(f'{column} >= ?')
+        params.append(since)
+    if until is not None:
+        where.append(f'{column} < ?')
+        params.append(until)
+    return where, params
 
 if __name__ == "__main__":
+    import sys
+    if "--migrate" in sys.argv:
+        # Create or upgrade news.db without fetching (the API waits for this)
+        init_db()
+        print(f"✓ {DB_PATH} at schema v{SCHEMA_VERSION}")
+        sys.exit()
+    if "--reindex" in sys.argv:
+        # Re-tag stored articles after SYMBOLS changed
+        init_db()
+        conn = sqlite3.connect(DB_PATH)
+        rebuild_symbol_index(conn)
+        rebuild_rollups(conn)
+        conn.commit()
+        conn.close()
+        print(f"✓ Re-tagged {DB_PATH} for {', '.join(SYMBOLS)}")
+        sys.exit()
     fetch_and_store()
     print("Latest 5 articles (all):")
-    for title, summary, url, source, published, score, label in get_latest_articles(5):
+    for title, summary, url, source, published, score, label, published_ts, cluster_id in get_latest_articles(5):
         print(f"\n[{label.upper()} {score:.2f}] {source.upper()}: {title}")
         print(f"  {url}")
@@ -0,0 +1,46 @@
+"""Sentiment helpers shared by the scraper, API, bot and event study
+
+One VADER analyzer per process, the tickers the news is tagged with, and
+the keywords the bot scores an article's importance with. Importing this module loads neither VADER nor
+the bot, so analysis scripts can use it without side effects.
+
+SentimentIntensityAnalyzer() parses vader_lexicon.txt and the emoji lexicon
+each time it is constructed (about 10 ms). The scraper, API and bot all
+call get_analyzer(), so each process parses the lexicon once, on first use.
+
+An on-disk cache of the parsed lexicon (marshal or pickle) is not worth it:
+loading it in a fresh process costs as much as parsing the text files (see
+the vader_load benchmark).
+"""
+
+# Tickers the scraper tags articles with (symbol index and per-symbol rollups),
+# each with the words that mark an article as about it. This is the one list:
+# the API rejects other symbols and the bot will not start on one. After
+# adding a ticker, `python scraper.py --reindex` tags the articles already stored.
+SYMBOLS = {
+    'XOM': ['exxon', 'exxonmobil', 'xom'],
+}
+
+# Words that make an article more important to the bot (SentimentAnalyzer._calculate_importance)
+IMPORTANT_KEYWORDS = [
+    'earnings', 'profit', 'revenue', 'loss', 'lawsuit', 'merger',
+    'acquisition', 'ceo', 'investigation', 'regulation', 'dividend',
+    'upgrade', 'downgrade', 'analyst', 'breakthrough', 'crisis',
+    'scandal', 'partnership', 'contract', 'bankruptcy', 'fraud'
+]
+
+_analyzer = None
+
+
+def load_analyzer():
+    """A new SentimentIntensityAnalyzer"""
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+def get_analyzer():
+    """Process-wide analyzer, created on first use"""
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = load_analyzer()
+    return _analyzer
@@ -1,28 +1,21 @@
-from collections import defaultdict
-from datetime import datetime
+import sqlite3
+from datetime import datetime, timezone
+from rollups import get_series
+from scraper import DB_PATH
 
-sentiment_file = "exxon_news_labeled.txt"
-daily = defaultdict(lambda: {'positive':0, 'negative':0, 'neutral':0})
+SYMBOL = 'XOM'  # use '*' for all stored news
 
-with open(sentiment_file, 'r', encoding='utf-8') as f:
-    for line in f:
-        parts = line.strip().split('\t')
-        # If the date is included in the headline tab, extract it; else use today
-        if len(parts) == 2:
-            sentiment, headline = parts
-            date_str = datetime.today().strftime('%Y-%m-%d')
-        elif len(parts) == 3:
-            sentiment, date_str, headline = parts
-        else:
-            continue
-        # You may need to refine this based on your actual file format
-        daily[date_str][sentiment] += 1
+# Daily positive/negative counts come straight from the pre-aggregated rollups
+conn = sqlite3.connect(DB_PATH)
+daily = get_series(conn, '1d', symbol=SYMBOL)
+conn.close()
 
-for date, counts in sorted(daily.items()):
-    if counts['positive'] > counts['negative']:
+for point in daily:
+    date = datetime.fromtimestamp(point['bucket'], tz=timezone.utc).strftime('%Y-%m-%d')
+    if point['positive'] > point['negative']:
         signal = 'BUY'
-    elif counts['negative'] > counts['positive']:
+    elif point['negative'] > point['positive']:
         signal = 'SELL'
     else:
         signal = 'HOLD'
-    print(f"{date}\tPos:{counts['positive']}\tNeg:{counts['negative']}\tSignal:{signal}")
+    print(f"{date}\tPos:{point['positive']}\tNeg:{point['negative']}\tSignal:{signal}")